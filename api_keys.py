@@ -1,36 +1,142 @@
 """
 Simple API key management for TTS service.
+
+Keys are stored as SHA-256 digests; the raw key is only returned once, at creation.
+Entries written before hashing was introduced (plaintext keys) are still accepted.
 """
+import contextlib
+import hashlib
 import json
 import os
+import re
 import secrets
 import threading
+import uuid
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
 _KEYS_FILE = os.path.join(os.path.dirname(__file__), "api_keys.json")
-_LOCK = threading.Lock()
+# Only writers take the lock; readers test membership against the cached dict.
+_LOCK = threading.RLock()
+# Label of the key handed to the bundled web UI. That key is embedded in every page
+# served, so its entry also keeps the raw value and all worker processes share it.
+_PUBLIC_LABEL = "public_web"
+
+_CACHE = {}
+_CACHE_MTIME = 0
+_CACHE_DIGESTS = frozenset()
+
+# Raw key handed to the bundled web UI, minted once per process if needed
+_PUBLIC_KEY = None
+
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def _hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _is_digest(entry):
+    return _DIGEST_RE.fullmatch(entry) is not None
+
+
+def _digests_of(keys):
+    return frozenset(entry if _is_digest(entry) else _hash_key(entry) for entry in keys)
+
+
+def _keys_file_mtime():
+    try:
+        return os.stat(_KEYS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _read_keys_file():
+    with open(_KEYS_FILE, "rb") as handle:
+        data = handle.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _refresh_if_stale():
+    """Reparse the keys file only when its mtime changed since the last load."""
+    global _CACHE, _CACHE_MTIME, _CACHE_DIGESTS
+    mtime = _keys_file_mtime()
+    if mtime == _CACHE_MTIME:
+        return _CACHE
+    with _LOCK:
+        if mtime != _CACHE_MTIME:
+            keys = _read_keys_file() if mtime else {}
+            _CACHE_DIGESTS = _digests_of(keys)
+            _CACHE = keys
+            _CACHE_MTIME = mtime
+    return _CACHE
 
 
 def _load_keys():
-    if not os.path.exists(_KEYS_FILE):
-        return {}
-    with open(_KEYS_FILE, "r", encoding="utf-8") as handle:
-        return json.load(handle)
+    return _refresh_if_stale()
+
+
+@contextlib.contextmanager
+def _write_lock():
+    """Serialize read-modify-write of the keys file across threads and worker processes"""
+    with _LOCK:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{_KEYS_FILE}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_keys_for_update():
+    """Fresh copy of the keys on disk; call with _write_lock held"""
+    # Copy so lock-free readers never observe a dict being mutated
+    return dict(_read_keys_file()) if _keys_file_mtime() else {}
 
 
 def _save_keys(keys):
-    with open(_KEYS_FILE, "w", encoding="utf-8") as handle:
-        json.dump(keys, handle, indent=2, sort_keys=True)
+    global _CACHE, _CACHE_MTIME, _CACHE_DIGESTS
+    # Write a temp file and rename it, so readers never see a half-written file
+    tmp_path = f"{_KEYS_FILE}.{uuid.uuid4().hex}.tmp"
+    if orjson is not None:
+        with open(tmp_path, "wb") as handle:
+            handle.write(orjson.dumps(keys, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(keys, handle, indent=2, sort_keys=True)
+    os.replace(tmp_path, _KEYS_FILE)
+    _CACHE_DIGESTS = _digests_of(keys)
+    _CACHE = keys
+    _CACHE_MTIME = _keys_file_mtime()
+
+
+def _add_key(keys, label):
+    key = secrets.token_urlsafe(32)
+    keys[_hash_key(key)] = {
+        "label": label,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    return key
 
 
 def create_api_key(label="public"):
-    with _LOCK:
-        keys = _load_keys()
-        key = secrets.token_urlsafe(32)
-        keys[key] = {
-            "label": label,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
+    with _write_lock():
+        keys = _load_keys_for_update()
+        key = _add_key(keys, label)
         _save_keys(keys)
         return key
 
@@ -38,24 +144,45 @@ def create_api_key(label="public"):
 def is_valid_key(key):
     if not key:
         return False
-        
+
     # Check for hardcoded master key from environment variables (persistent across redeploys)
     master_key = os.environ.get("API_KEY")
-    if master_key and key == master_key:
+    # Compare as bytes: compare_digest rejects non-ASCII str, and headers arrive as latin-1
+    if master_key and secrets.compare_digest(key.encode(), master_key.encode()):
         return True
-        
-    with _LOCK:
-        keys = _load_keys()
-        return key in keys
+
+    _refresh_if_stale()
+    return _hash_key(key) in _CACHE_DIGESTS
 
 def get_first_key():
+    """Return a raw key for the bundled web frontend."""
+    global _PUBLIC_KEY
     # Prefer environment variable key if set
     master_key = os.environ.get("API_KEY")
     if master_key:
         return master_key
-        
-    with _LOCK:
-        keys = _load_keys()
-        if keys:
-            return list(keys.keys())[0]
-    return None
+
+    if _PUBLIC_KEY is None or not is_valid_key(_PUBLIC_KEY):
+        with _write_lock():
+            if _PUBLIC_KEY is None or not is_valid_key(_PUBLIC_KEY):
+                _PUBLIC_KEY = _shared_public_key()
+    return _PUBLIC_KEY
+
+
+def _shared_public_key():
+    """The one UI key all processes use, creating it if needed; call with _write_lock held"""
+    keys = _load_keys_for_update()
+    for entry, info in keys.items():
+        if isinstance(info, dict) and info.get("label") == _PUBLIC_LABEL:
+            raw = info.get("key")
+            if raw and _hash_key(raw) == entry:
+                return raw
+    # Digests cannot be turned back into keys, so reuse a legacy
+    # plaintext entry if there is one, otherwise mint the shared key
+    legacy_key = next((entry for entry in keys if not _is_digest(entry)), None)
+    if legacy_key:
+        return legacy_key
+    key = _add_key(keys, _PUBLIC_LABEL)
+    keys[_hash_key(key)]["key"] = key
+    _save_keys(keys)
+    return key
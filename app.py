@@ -1,34 +1,73 @@
 """
 Flask API Server for TTS Generator
 """
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, request, jsonify, make_response, send_file, render_template
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.wsgi import ClosingIterator
 import os
 import logging
+import threading
+import time
 from tts_engine import get_tts_engine
-from audio_processor import AudioProcessor
 from config import Config
+from log_utils import configure_logging
 from api_keys import create_api_key, is_valid_key, get_first_key
 import traceback
+import msgspec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson (serializes straight to bytes)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize config
 config = Config()
+app.config['USE_X_SENDFILE'] = config.USE_X_SENDFILE
+
+# Hot-path lookups, built once at import
+_SUPPORTED_LANGUAGES = config.SUPPORTED_LANGUAGES
+_VOICE_PROFILES = config.VOICE_PROFILES
+_NAME_TO_CODE = {info['name'].lower(): code for code, info in _SUPPORTED_LANGUAGES.items()}
+_DL_NAMES = {code: f'speech_{code}.mp3' for code in _SUPPORTED_LANGUAGES}
+_INLINE_DISPOSITIONS = {code: f'inline; filename="{name}"' for code, name in _DL_NAMES.items()}
+_AUDIO_MIMETYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav'}
 
-# Initialize TTS engine (lazy loading)
+# Initialize TTS engine (loaded in a background thread at startup)
 tts_engine = None
+_engine_lock = threading.Lock()
+
+# Caps how many requests may be synthesizing at once
+_synthesis_slots = threading.BoundedSemaphore(config.MAX_CONCURRENT_SYNTHESIS)
 
 def _extract_api_key(req):
     auth_header = req.headers.get('Authorization', '')
-    if auth_header.lower().startswith('bearer '):
-        return auth_header.split(' ', 1)[1].strip()
+    # Only the scheme prefix is case-folded, not the whole header
+    if auth_header[:7].lower() == 'bearer ':
+        return auth_header[7:].strip()
     return req.headers.get('X-API-Key', '').strip()
 
 def _require_api_key(req):
@@ -44,18 +83,30 @@ def get_engine():
     """Get or initialize TTS engine"""
     global tts_engine
     if tts_engine is None:
-        logger.info("Initializing TTS engine...")
-        tts_engine = get_tts_engine()
+        with _engine_lock:
+            if tts_engine is None:
+                logger.info("Initializing TTS engine...")
+                tts_engine = get_tts_engine()
     return tts_engine
 
+def _warm_engine():
+    try:
+        engine = get_engine()
+    except Exception as e:
+        logger.error(f"Background TTS engine initialization failed: {e}")
+        return
+    # The engine is published by now, so requests are served while XTTS loads
+    if config.WARMUP_ON_INIT:
+        engine.warmup()
+
+# Start loading now so the first request does not pay the init cost
+threading.Thread(target=_warm_engine, name='tts-engine-init', daemon=True).start()
+
 @app.route('/')
 def index():
     """Serve the main page"""
-    # Get a valid API key for the frontend
+    # Get a valid API key for the frontend (created if none is available)
     api_key = get_first_key()
-    if not api_key:
-        # Create one if missing/deleted
-        api_key = create_api_key(label="public_web")
         
     return render_template('index.html', api_key=api_key)
 
@@ -88,7 +139,7 @@ def engine_status():
             'edge_tts_available': engine.edge_tts_available,
             'edge_tts_via_module': engine.edge_tts_via_module,
             'offline_available': engine.offline_available,
-            'xtts_available': engine.xtts is not None,
+            'xtts_available': engine.xtts_available,
             'voice_profiles': config.VOICE_PROFILES,
             'supported_languages': list(config.SUPPORTED_LANGUAGES.keys())
         }
@@ -141,11 +192,6 @@ def create_key():
             'error': str(e)
         }), 500
 
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
 def get_voice_id(lang_code, gender):
     """Get Voice ID based on language code and gender"""
     if not gender:
@@ -156,10 +202,30 @@ def get_voice_id(lang_code, gender):
         gender = 'female'
         
     key = f"{lang_code}_{gender}"
-    return config.VOICE_PROFILES.get(key)
+    return _VOICE_PROFILES.get(key)
+
+class GenerateRequest(msgspec.Struct):
+    """JSON body shared by all generate endpoints"""
+    text: str = ''
+    language: str = 'en'
+    speed: float = 1.0
+    pitch: float = 0  # Floats are accepted and truncated, as int() did
+    gender: str = 'female'
+    stream: bool = True  # Default to TRUE for better UX
 
-from io import BytesIO
-from flask import Response
+# Lax mode keeps accepting numbers sent as strings ("1.2"), as float()/int() did
+_generate_decoder = msgspec.json.Decoder(GenerateRequest, strict=False)
+_batch_decoder = msgspec.json.Decoder(list[GenerateRequest], strict=False)
+
+def _parse_generate_request(req):
+    """Decode and type-check the request body in one pass; returns (GenerateRequest, error_response)"""
+    try:
+        return _generate_decoder.decode(req.get_data() or b'{}'), None
+    except (msgspec.DecodeError, msgspec.ValidationError) as e:
+        return None, (jsonify({
+            'success': False,
+            'error': f'Invalid request body: {e}'
+        }), 400)
 
 def process_generate_request(text, lang_code, speed, pitch, gender, stream=False):
     """Common logic for processing generation request"""
@@ -178,58 +244,131 @@ def process_generate_request(text, lang_code, speed, pitch, gender, stream=False
     
     # Validate speed and pitch
     speed = max(config.MIN_SPEED, min(config.MAX_SPEED, speed))
-    pitch = max(config.MIN_PITCH, min(config.MAX_PITCH, pitch))
+    pitch = int(max(config.MIN_PITCH, min(config.MAX_PITCH, pitch)))
     
     # Get Voice ID
     voice_id = get_voice_id(lang_code, gender)
     
-    logger.info(f"📝 Request: lang={lang_code}, gender={gender}, speed={speed}, stream={stream}")
-    logger.info(f"   Voice ID selected: {voice_id}")
-    logger.info(f"   Text length: {len(text)} chars")
+    logger.debug("📝 Request: lang=%s, gender=%s, speed=%s, stream=%s", lang_code, gender, speed, stream)
+    logger.debug("   Voice ID selected: %s", voice_id)
+    logger.debug("   Text length: %s chars", len(text))
     
-    engine = get_engine()
+    # Bound concurrent synthesis so overload queues briefly and then sheds with 503
+    if not _synthesis_slots.acquire(timeout=config.SYNTHESIS_QUEUE_TIMEOUT):
+        logger.warning("All synthesis slots busy, rejecting request")
+        return jsonify({
+            'success': False,
+            'error': 'Server busy, please retry shortly'
+        }), 503, {'Retry-After': '1'}
     
-    # --- Option 1: Streaming Response (Low Latency) ---
-    if stream:
+    slot_held = True
+    try:
+        engine = get_engine()
+        
+        # Audio that is already on disk goes out as a file even for stream requests,
+        # so the server can use sendfile and answer Range / conditional requests
+        cached = engine.find_cached(text, lang_code, speed, voice_id) if stream else None
+        
+        # --- Option 1: Streaming Response (Low Latency) ---
+        if stream and cached is None:
+            try:
+                # The stream synthesizes lazily, so the slot is released only
+                # when the server closes the iterator (finished or disconnected)
+                audio_stream = ClosingIterator(
+                    engine.generate_speech_stream(
+                        text=text,
+                        language=lang_code,
+                        speed=speed,
+                        voice_id=voice_id
+                    ),
+                    _synthesis_slots.release
+                )
+                response = Response(
+                    audio_stream,
+                    mimetype='audio/mpeg',
+                    direct_passthrough=True,
+                    headers={
+                        'Content-Disposition': _INLINE_DISPOSITIONS[lang_code],
+                        'Cache-Control': 'no-cache'
+                    }
+                )
+                slot_held = False
+                return response
+            except Exception as e:
+                logger.error(f"Streaming failed: {e}")
+                # Fallback to non-streaming if requested stream fails
+                pass
+
+        # --- Option 2: File Response (Standard) ---
         try:
-            return Response(
-                engine.generate_speech_stream(
+            if cached:
+                audio_path, mimetype = cached
+            else:
+                audio_path = engine.generate_speech(
                     text=text,
                     language=lang_code,
                     speed=speed,
-                    voice_id=voice_id
-                ),
-                mimetype='audio/mpeg',
-                headers={
-                    'Content-Disposition': f'inline; filename="speech_{lang_code}.mp3"',
-                    'Cache-Control': 'no-cache'
-                }
-            )
+                    voice_id=voice_id,
+                    return_path=True
+                )
+                mimetype = _AUDIO_MIMETYPES.get(audio_path[-3:], 'audio/wav')
+            
+            # Serve from disk so the WSGI server can use its file wrapper (sendfile)
+            return _send_audio(engine, audio_path, mimetype, _DL_NAMES[lang_code])
         except Exception as e:
-            logger.error(f"Streaming failed: {e}")
-            # Fallback to non-streaming if requested stream fails
-            pass
+            logger.error(f"Generation failed: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if slot_held:
+            _synthesis_slots.release()
 
-    # --- Option 2: Full Buffer Response (Standard) ---
-    try:
-        audio_content, mimetype = engine.generate_speech(
-            text=text,
-            language=lang_code,
-            speed=speed,
-            voice_id=voice_id,
-            return_bytes=True
-        )
-        
-        # Return audio stream
-        return send_file(
-            BytesIO(audio_content),
-            mimetype=mimetype,
-            as_attachment=False,
-            download_name=f'speech_{lang_code}.mp3'
-        )
-    except Exception as e:
-        logger.error(f"Generation failed: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+def _send_audio(engine, audio_path, mimetype, download_name):
+    """
+    send_file for generated audio. Cache files get their cache key as ETag, browser
+    caching and a GET-able Content-Location. The ETag is weak: an evicted entry that
+    is synthesized again sounds the same but is not guaranteed to be byte-identical.
+    """
+    cache_key = engine.cache_key_of(audio_path)
+    response = send_file(
+        audio_path,
+        mimetype=mimetype,
+        as_attachment=False,
+        download_name=download_name,
+        conditional=cache_key is None,
+        etag=cache_key is None,
+        max_age=config.AUDIO_CACHE_MAX_AGE if cache_key else None
+    )
+    if cache_key:
+        response.set_etag(cache_key, weak=True)
+        # send_file only emits strong ETags, so the conditional/Range handling runs here.
+        # A weak validator must not satisfy If-Range, so such requests get the full file
+        environ = request.environ
+        if 'HTTP_RANGE' in environ and environ.get('HTTP_IF_RANGE', '').lstrip().startswith(('"', 'W/')):
+            environ = {**environ}
+            del environ['HTTP_RANGE']
+        response = response.make_conditional(environ, accept_ranges=True, complete_length=response.content_length)
+        # Responses need an API key, so shared caches must not hand them out
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.headers['Content-Location'] = f'/api/audio/{cache_key}'
+    return response
+
+@app.route('/api/audio/<cache_key>', methods=['GET'])
+def cached_audio(cache_key):
+    """Re-fetch cached audio by key; repeat clients get 304 via If-None-Match / If-Modified-Since"""
+    auth_error = _require_api_key(request)
+    if auth_error:
+        return auth_error
+    
+    engine = get_engine()
+    cached = engine.cached_file(cache_key)
+    if cached is None:
+        return jsonify({
+            'success': False,
+            'error': 'File not found'
+        }), 404
+    audio_path, mimetype = cached
+    return _send_audio(engine, audio_path, mimetype, f'{cache_key}.{audio_path[-3:]}')
 
 @app.route('/<language_name>/<gender>/generate', methods=['POST'])
 def generate_by_language_and_gender(language_name, gender):
@@ -244,12 +383,7 @@ def generate_by_language_and_gender(language_name, gender):
             
         # Find language code from name
         language_name = language_name.lower()
-        lang_code = None
-        
-        for code, info in config.SUPPORTED_LANGUAGES.items():
-            if info['name'].lower() == language_name:
-                lang_code = code
-                break
+        lang_code = _NAME_TO_CODE.get(language_name)
         
         if not lang_code:
             return jsonify({
@@ -266,16 +400,14 @@ def generate_by_language_and_gender(language_name, gender):
             }), 400
             
         # Get request data for text/speed/pitch
-        data = request.get_json(silent=True) or {}
-        text = data.get('text', '').strip()
-        speed = float(data.get('speed', 1.0))
-        pitch = int(data.get('pitch', 0))
-        stream = data.get('stream', True)  # Default to TRUE for better UX
+        body, error = _parse_generate_request(request)
+        if error:
+            return error
         
         # URL gender overrides JSON gender if both provided (URL is source of truth here)
-        logger.info(f"🌐 Endpoint: /{language_name}/{gender}/generate")
+        logger.debug("🌐 Endpoint: /%s/%s/generate", language_name, gender)
         
-        return process_generate_request(text, lang_code, speed, pitch, gender, stream=stream)
+        return process_generate_request(body.text.strip(), lang_code, body.speed, body.pitch, gender, stream=body.stream)
 
     except Exception as e:
         logger.error(f"Error in language/gender route: {e}")
@@ -295,12 +427,7 @@ def generate_by_language_name(language_name):
             
         # Find language code from name
         language_name = language_name.lower()
-        lang_code = None
-        
-        for code, info in config.SUPPORTED_LANGUAGES.items():
-            if info['name'].lower() == language_name:
-                lang_code = code
-                break
+        lang_code = _NAME_TO_CODE.get(language_name)
         
         if not lang_code:
             return jsonify({
@@ -309,14 +436,11 @@ def generate_by_language_name(language_name):
             }), 404
             
         # Get request data
-        data = request.get_json(silent=True) or {}
-        text = data.get('text', '').strip()
-        speed = float(data.get('speed', 1.0))
-        pitch = int(data.get('pitch', 0))
-        gender = data.get('gender', 'female')
-        stream = data.get('stream', True)  # Default to TRUE
+        body, error = _parse_generate_request(request)
+        if error:
+            return error
         
-        return process_generate_request(text, lang_code, speed, pitch, gender, stream=stream)
+        return process_generate_request(body.text.strip(), lang_code, body.speed, body.pitch, body.gender, stream=body.stream)
 
     except Exception as e:
         logger.error(f"Error in language route: {e}")
@@ -335,32 +459,28 @@ def generate_speech():
             return auth_error
 
         # Get request data
-        data = request.get_json()
-        
-        if not data:
+        if not request.get_data():
             return jsonify({
                 'success': False,
                 'error': 'No data provided'
             }), 400
         
-        text = data.get('text', '').strip()
-        language = data.get('language', 'en')
-        speed = float(data.get('speed', 1.0))
-        pitch = int(data.get('pitch', 0))
-        gender = data.get('gender', 'female')
-        stream = data.get('stream', True)  # Default to TRUE
+        body, error = _parse_generate_request(request)
+        if error:
+            return error
+        language = body.language
         
         # Check if voice_profile is passed (legacy support)
         # If voice_profile is passed, we might ignore gender logic, or try to decode it
         # But for consistency, let's use the new logic if language is supported
         
-        if language not in config.SUPPORTED_LANGUAGES:
+        if language not in _SUPPORTED_LANGUAGES:
             return jsonify({
                 'success': False,
                 'error': f'Language {language} not supported'
             }), 400
             
-        return process_generate_request(text, language, speed, pitch, gender, stream=stream)
+        return process_generate_request(body.text.strip(), language, body.speed, body.pitch, body.gender, stream=body.stream)
         
     except Exception as e:
         logger.error(f"Error generating speech: {e}")
@@ -370,25 +490,119 @@ def generate_speech():
             'error': str(e)
         }), 500
 
+@app.route('/api/generate/batch', methods=['POST'])
+def generate_speech_batch():
+    """Generate several utterances in one request; the body is a JSON array of generate bodies"""
+    try:
+        auth_error = _require_api_key(request)
+        if auth_error:
+            return auth_error
+        
+        try:
+            bodies = _batch_decoder.decode(request.get_data() or b'[]')
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid request body: {e}'
+            }), 400
+        
+        if not bodies or len(bodies) > config.BATCH_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'Send between 1 and {config.BATCH_MAX_ITEMS} items'
+            }), 400
+        
+        items = []
+        for index, body in enumerate(bodies):
+            text = body.text.strip()
+            if body.language not in _SUPPORTED_LANGUAGES:
+                error = f'Language {body.language} not supported'
+            elif not text:
+                error = 'Text cannot be empty'
+            elif len(text) > config.MAX_TEXT_LENGTH:
+                error = f'Text too long. Maximum {config.MAX_TEXT_LENGTH} characters allowed'
+            else:
+                items.append({
+                    'text': text,
+                    'language': body.language,
+                    'speed': max(config.MIN_SPEED, min(config.MAX_SPEED, body.speed)),
+                    'voice_id': get_voice_id(body.language, body.gender)
+                })
+                continue
+            return jsonify({
+                'success': False,
+                'error': f'Item {index}: {error}'
+            }), 400
+        
+        logger.debug("📝 Batch request: %s items", len(items))
+        
+        # Each parallel synthesis holds its own slot: wait for one, then take up to
+        # BATCH_MAX_WORKERS - 1 more only if they are free right now
+        if not _synthesis_slots.acquire(timeout=config.SYNTHESIS_QUEUE_TIMEOUT):
+            logger.warning("All synthesis slots busy, rejecting request")
+            return jsonify({
+                'success': False,
+                'error': 'Server busy, please retry shortly'
+            }), 503, {'Retry-After': '1'}
+        slots = 1
+        while slots < min(len(items), config.BATCH_MAX_WORKERS) and _synthesis_slots.acquire(blocking=False):
+            slots += 1
+        try:
+            engine = get_engine()
+            outcomes = engine.generate_speech_batch(items, return_path=True, max_workers=slots)
+        finally:
+            for _ in range(slots):
+                _synthesis_slots.release()
+        
+        results = []
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                results.append({'success': False, 'error': str(outcome)})
+                continue
+            cache_key = engine.cache_key_of(outcome)
+            filename = os.path.basename(outcome)
+            results.append({
+                'success': True,
+                'url': f'/api/audio/{cache_key}' if cache_key else f'/api/download/{filename}',
+                'mimetype': _AUDIO_MIMETYPES.get(filename[-3:], 'audio/wav')
+            })
+        return jsonify({'success': True, 'results': results})
+        
+    except Exception as e:
+        logger.error(f"Error generating speech batch: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_audio(filename):
     """Download generated audio file"""
     try:
-        file_path = os.path.join(config.OUTPUT_DIR, filename)
+        # Let nginx send the file itself (it answers 404 for missing files)
+        if config.X_ACCEL_REDIRECT_PREFIX:
+            response = make_response('')
+            response.headers['X-Accel-Redirect'] = f'{config.X_ACCEL_REDIRECT_PREFIX}{filename}'
+            response.headers['Content-Type'] = _AUDIO_MIMETYPES.get(filename[-3:], 'audio/wav')
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
         
-        if not os.path.exists(file_path):
-            return jsonify({
-                'success': False,
-                'error': 'File not found'
-            }), 404
+        file_path = os.path.join(config.OUTPUT_DIR, filename)
         
+        # send_file stats the file anyway, so rely on that instead of a separate exists check
         return send_file(
             file_path,
-            mimetype='audio/wav',
+            mimetype=_AUDIO_MIMETYPES.get(filename[-3:], 'audio/wav'),
             as_attachment=True,
             download_name=filename
         )
         
+    except FileNotFoundError:
+        return jsonify({
+            'success': False,
+            'error': 'File not found'
+        }), 404
     except Exception as e:
         logger.error(f"Error downloading file: {e}")
         return jsonify({
@@ -396,6 +610,23 @@ def download_audio(filename):
             'error': str(e)
         }), 500
 
+def _sweep_output_dir():
+    """Periodically delete generated files that are older than OUTPUT_MAX_AGE_SECONDS"""
+    while True:
+        time.sleep(config.OUTPUT_SWEEP_INTERVAL)
+        cutoff = time.time() - config.OUTPUT_MAX_AGE_SECONDS
+        try:
+            with os.scandir(config.OUTPUT_DIR) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Output sweep failed: {e}")
+
+threading.Thread(target=_sweep_output_dir, name='output-sweeper', daemon=True).start()
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -4,15 +4,213 @@ Audio Processing Utilities
 import numpy as np
 import soundfile as sf
 import librosa
-from pydub import AudioSegment
+import hashlib
 import os
+import shutil
 import logging
+import uuid
+from config import Config
+
+try:
+    import lameenc
+except ImportError:
+    lameenc = None
 
 logger = logging.getLogger(__name__)
 
+config = Config()
+
+# Processed-audio results, kept apart from the TTS cache entries in CACHE_DIR
+_PROCESSED_CACHE_DIR = os.path.join(config.CACHE_DIR, 'processed')
+
+# Containers libsndfile can write directly, without an ffmpeg subprocess
+_SOUNDFILE_FORMATS = {'wav': 'WAV', 'ogg': 'OGG', 'flac': 'FLAC'}
+
 class AudioProcessor:
     """Audio processing and enhancement utilities"""
     
+    @staticmethod
+    def _load_audio(audio_path):
+        """
+        Decode audio with libsndfile, falling back to librosa for formats
+        soundfile cannot read (e.g. MP3 on older libsndfile builds)
+        
+        Args:
+            audio_path (str): Input audio file path
+            
+        Returns:
+            tuple: (mono float32 samples, sample rate)
+        """
+        try:
+            audio, sr = sf.read(audio_path, dtype='float32', always_2d=False)
+        except Exception:
+            audio, sr = librosa.load(audio_path, sr=None)
+        
+        if audio.ndim > 1:
+            # librosa.load downmixes to mono; keep the same behaviour
+            audio = audio.mean(axis=1)
+        # Keep the whole pipeline in contiguous 32-bit floats
+        return np.ascontiguousarray(audio, dtype=np.float32), sr
+    
+    @staticmethod
+    def _save_audio(path, audio, sr):
+        """Write samples, quantized to 16-bit PCM for WAV/FLAC targets"""
+        ext = os.path.splitext(path)[1].lower()
+        subtype = 'PCM_16' if ext in ('.wav', '.flac') else None
+        sf.write(path, audio, sr, subtype=subtype)
+    
+    @staticmethod
+    def _cache_key(path, op, params):
+        """Cache key for an operation on a specific version (mtime + size) of a file"""
+        st = os.stat(path)
+        key_data = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}:{op}:{params}"
+        return hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _trim_and_normalize(audio, top_db=None, target_peak=None):
+        """
+        Trim leading/trailing silence and/or peak-normalize from a single
+        np.abs pass: the same magnitude buffer yields the peak and both cut points.
+        """
+        absx = np.abs(audio)
+        peak = absx.max() if absx.size else 0
+        if peak <= 0:
+            return audio
+        
+        if top_db is not None:
+            loud = np.flatnonzero(absx > peak * np.float32(10 ** (-top_db / 20)))
+            # The peak sample is always kept, so the peak is unchanged by trimming
+            audio = audio[loud[0]:loud[-1] + 1]
+        if target_peak is not None:
+            audio *= np.float32(target_peak / peak)
+        return audio
+    
+    @staticmethod
+    def _apply_op(audio, sr, op, value):
+        """Apply a single pipeline operation to a decoded float32 buffer"""
+        if op == 'trim':
+            audio = AudioProcessor._trim_and_normalize(audio, top_db=value)
+        elif op == 'normalize':
+            audio = AudioProcessor._trim_and_normalize(audio, target_peak=value)
+        elif op == 'trim_normalize':
+            audio = AudioProcessor._trim_and_normalize(audio, *value)
+        elif op == 'pitch':
+            audio = librosa.effects.pitch_shift(audio, sr=sr, n_steps=value)
+        elif op == 'speed':
+            audio = librosa.effects.time_stretch(audio, rate=value)
+        elif op == 'speed_pitch':
+            audio = AudioProcessor._stretch_and_shift(audio, sr, *value)
+        else:
+            raise ValueError(f"Unknown audio operation: {op}")
+        return audio
+    
+    @staticmethod
+    def _stretch_and_shift(audio, sr, speed, semitones):
+        """
+        Time-stretch and pitch-shift with a single STFT/ISTFT pair.
+        
+        librosa's pitch_shift is a time_stretch by 2**(-n/12) followed by a
+        resample, so both stretches collapse into one phase-vocoder pass.
+        """
+        pitch_rate = 2.0 ** (-float(semitones) / 12)
+        rate = speed * pitch_rate
+        
+        stft = librosa.stft(audio)
+        stretched = librosa.phase_vocoder(stft, rate=rate)
+        audio_stretched = librosa.istft(
+            stretched, dtype=audio.dtype, length=int(round(audio.shape[-1] / rate))
+        )
+        audio_shifted = librosa.resample(audio_stretched, orig_sr=float(sr) / pitch_rate, target_sr=sr)
+        return librosa.util.fix_length(audio_shifted, size=int(round(audio.shape[-1] / speed)))
+    
+    @staticmethod
+    def _fuse_ops(ops):
+        """
+        Merge adjacent operations that can share work: speed + pitch share one
+        STFT, trim followed by normalize share one magnitude pass
+        """
+        fused = []
+        for op, value in ops:
+            if fused and {op, fused[-1][0]} == {'speed', 'pitch'}:
+                prev_op, prev_value = fused.pop()
+                speed, semitones = (value, prev_value) if op == 'speed' else (prev_value, value)
+                fused.append(('speed_pitch', (speed, semitones)))
+            elif fused and fused[-1][0] == 'trim' and op == 'normalize':
+                _, top_db = fused.pop()
+                fused.append(('trim_normalize', (top_db, value)))
+            else:
+                fused.append((op, value))
+        return fused
+    
+    @staticmethod
+    def _run_pipeline(audio_path, ops, output_path):
+        """
+        Decode once, apply every operation to the same buffer and encode once.
+        Results are cached under CACHE_DIR/processed keyed on the input file version and ops.
+        """
+        cache_path = None
+        if config.ENABLE_CACHE:
+            ext = os.path.splitext(output_path)[1] or '.wav'
+            key = AudioProcessor._cache_key(audio_path, 'pipeline', tuple(ops))
+            # Sharded like the TTS cache (whose size limit also covers these files)
+            cache_path = os.path.join(_PROCESSED_CACHE_DIR, key[:2], f"{key}{ext}")
+            if cache_path == output_path:
+                if os.path.exists(cache_path):
+                    return output_path
+            else:
+                try:
+                    shutil.copyfile(cache_path, output_path)
+                    return output_path
+                except FileNotFoundError:
+                    pass
+        
+        audio, sr = AudioProcessor._load_audio(audio_path)
+        for op, value in AudioProcessor._fuse_ops(ops):
+            audio = AudioProcessor._apply_op(audio, sr, op, value)
+        AudioProcessor._save_audio(output_path, audio, sr)
+        
+        if cache_path and cache_path != output_path:
+            # Copy to a temp file and rename, so an interrupted copy never leaves a
+            # truncated entry and readers never see a partial file
+            tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                shutil.copyfile(output_path, tmp_path)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Could not cache processed audio: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        return output_path
+    
+    @staticmethod
+    def process_pipeline(audio_path, ops, output_path=None):
+        """
+        Apply several operations with a single decode/encode round-trip
+        
+        Args:
+            audio_path (str): Input audio file
+            ops (list): Operations in order, e.g.
+                [('trim', 20), ('normalize', 0.8), ('pitch', 2), ('speed', 1.1)]
+            output_path (str): Output file path (optional)
+            
+        Returns:
+            str: Path to processed audio
+        """
+        if output_path is None:
+            output_path = audio_path
+        
+        try:
+            AudioProcessor._run_pipeline(audio_path, ops, output_path)
+            logger.debug("Audio pipeline %s applied: %s", [op for op, _ in ops], output_path)
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Error processing audio pipeline: {e}")
+            return audio_path
+    
     @staticmethod
     def normalize_audio(audio_path, target_path=None):
         """
@@ -29,15 +227,9 @@ class AudioProcessor:
             target_path = audio_path
         
         try:
-            # Load audio
-            audio, sr = librosa.load(audio_path, sr=None)
-            
             # Normalize to -3dB
-            audio = librosa.util.normalize(audio) * 0.7
-            
-            # Save
-            sf.write(target_path, audio, sr)
-            logger.info(f"Audio normalized: {target_path}")
+            AudioProcessor._run_pipeline(audio_path, [('normalize', 0.7)], target_path)
+            logger.debug("Audio normalized: %s", target_path)
             return target_path
             
         except Exception as e:
@@ -58,15 +250,9 @@ class AudioProcessor:
             str: Path to processed audio
         """
         try:
-            # Load audio
-            audio, sr = librosa.load(audio_path, sr=None)
-            
             # Change speed using time stretching
-            audio_stretched = librosa.effects.time_stretch(audio, rate=speed_factor)
-            
-            # Save
-            sf.write(output_path, audio_stretched, sr)
-            logger.info(f"Speed changed to {speed_factor}x: {output_path}")
+            AudioProcessor._run_pipeline(audio_path, [('speed', speed_factor)], output_path)
+            logger.debug("Speed changed to %sx: %s", speed_factor, output_path)
             return output_path
             
         except Exception as e:
@@ -87,21 +273,38 @@ class AudioProcessor:
             str: Path to processed audio
         """
         try:
-            # Load audio
-            audio, sr = librosa.load(audio_path, sr=None)
-            
             # Change pitch
-            audio_shifted = librosa.effects.pitch_shift(audio, sr=sr, n_steps=semitones)
-            
-            # Save
-            sf.write(output_path, audio_shifted, sr)
-            logger.info(f"Pitch shifted by {semitones} semitones: {output_path}")
+            AudioProcessor._run_pipeline(audio_path, [('pitch', semitones)], output_path)
+            logger.debug("Pitch shifted by %s semitones: %s", semitones, output_path)
             return output_path
             
         except Exception as e:
             logger.error(f"Error changing pitch: {e}")
             return audio_path
     
+    @staticmethod
+    def speed_and_pitch(audio_path, speed_factor, semitones, output_path):
+        """
+        Change speed and pitch together (one STFT instead of two)
+        
+        Args:
+            audio_path (str): Input audio file
+            speed_factor (float): Speed multiplier (0.5 = half speed, 2.0 = double speed)
+            semitones (int): Number of semitones to shift (-12 to +12)
+            output_path (str): Output file path
+            
+        Returns:
+            str: Path to processed audio
+        """
+        try:
+            AudioProcessor._run_pipeline(audio_path, [('speed_pitch', (speed_factor, semitones))], output_path)
+            logger.debug("Speed changed to %sx and pitch shifted by %s semitones: %s", speed_factor, semitones, output_path)
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Error changing speed and pitch: {e}")
+            return audio_path
+    
     @staticmethod
     def convert_format(input_path, output_path, output_format='mp3'):
         """
@@ -116,18 +319,45 @@ class AudioProcessor:
             str: Path to converted audio
         """
         try:
-            # Load audio with pydub
-            audio = AudioSegment.from_file(input_path)
-            
-            # Export in target format
-            audio.export(output_path, format=output_format)
-            logger.info(f"Converted to {output_format}: {output_path}")
+            output_format = output_format.lower()
+            try:
+                if output_format in _SOUNDFILE_FORMATS:
+                    data, sr = sf.read(input_path, dtype='float32')
+                    sf.write(output_path, data, sr, format=_SOUNDFILE_FORMATS[output_format])
+                elif output_format == 'mp3' and lameenc is not None:
+                    AudioProcessor._encode_mp3(input_path, output_path)
+                else:
+                    AudioProcessor._convert_with_ffmpeg(input_path, output_path, output_format)
+            except RuntimeError:
+                # libsndfile could not decode the input; let ffmpeg handle it
+                AudioProcessor._convert_with_ffmpeg(input_path, output_path, output_format)
+            logger.debug("Converted to %s: %s", output_format, output_path)
             return output_path
             
         except Exception as e:
             logger.error(f"Error converting format: {e}")
             return input_path
     
+    @staticmethod
+    def _encode_mp3(input_path, output_path, bit_rate=128):
+        """Encode to MP3 in-process with LAME"""
+        data, sr = sf.read(input_path, dtype='int16', always_2d=True)
+        encoder = lameenc.Encoder()
+        encoder.set_bit_rate(bit_rate)
+        encoder.set_in_sample_rate(sr)
+        encoder.set_channels(data.shape[1])
+        encoder.set_quality(2)
+        mp3_data = encoder.encode(data.tobytes()) + encoder.flush()
+        with open(output_path, 'wb') as f:
+            f.write(mp3_data)
+    
+    @staticmethod
+    def _convert_with_ffmpeg(input_path, output_path, output_format):
+        """Fallback conversion through pydub (spawns ffmpeg)"""
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(input_path)
+        audio.export(output_path, format=output_format)
+    
     @staticmethod
     def enhance_quality(audio_path, output_path=None):
         """
@@ -144,18 +374,9 @@ class AudioProcessor:
             output_path = audio_path
         
         try:
-            # Load audio
-            audio, sr = librosa.load(audio_path, sr=None)
-            
-            # Apply gentle noise reduction (trim silence)
-            audio, _ = librosa.effects.trim(audio, top_db=20)
-            
-            # Normalize
-            audio = librosa.util.normalize(audio) * 0.8
-            
-            # Save
-            sf.write(output_path, audio, sr)
-            logger.info(f"Audio enhanced: {output_path}")
+            # Gentle noise reduction (trim silence) + normalize in one round-trip
+            AudioProcessor._run_pipeline(audio_path, [('trim', 20), ('normalize', 0.8)], output_path)
+            logger.debug("Audio enhanced: %s", output_path)
             return output_path
             
         except Exception as e:
@@ -174,9 +395,16 @@ class AudioProcessor:
             float: Duration in seconds
         """
         try:
-            audio, sr = librosa.load(audio_path, sr=None)
-            duration = librosa.get_duration(y=audio, sr=sr)
-            return duration
+            # Header-only read, no decode
+            info = sf.info(audio_path)
+            return info.frames / info.samplerate
+        except RuntimeError:
+            # soundfile cannot open this format; let librosa decode it
+            try:
+                return librosa.get_duration(path=audio_path)
+            except Exception as e:
+                logger.error(f"Error getting duration: {e}")
+                return 0.0
         except Exception as e:
             logger.error(f"Error getting duration: {e}")
             return 0.0
@@ -1,18 +1,47 @@
 """
 Configuration file for TTS Generator
 """
+import logging
 import os
 
+_XTTS_DTYPES = ('auto', 'bfloat16', 'float16', 'float32')
+
+def _xtts_dtype():
+    """XTTS_DTYPE from the environment; an unknown value falls back to auto"""
+    value = os.environ.get('XTTS_DTYPE', 'auto').strip().lower()
+    if value not in _XTTS_DTYPES:
+        logging.getLogger(__name__).warning(
+            "Unknown XTTS_DTYPE %r (expected one of %s), using 'auto'", value, ", ".join(_XTTS_DTYPES)
+        )
+        return 'auto'
+    return value
+
+_LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+def _log_level():
+    """LOG_LEVEL from the environment; an unknown value falls back to INFO"""
+    value = os.environ.get('LOG_LEVEL', 'INFO').strip().upper()
+    if value not in _LOG_LEVELS:
+        logging.getLogger(__name__).warning(
+            "Unknown LOG_LEVEL %r (expected one of %s), using 'INFO'", value, ", ".join(_LOG_LEVELS)
+        )
+        return 'INFO'
+    return value
+
 class Config:
     # Server Configuration
     HOST = '0.0.0.0'
     PORT = int(os.environ.get('PORT', 5000))
     DEBUG = os.environ.get('FLASK_1ENV') == 'development'
+    LOG_LEVEL = _log_level()  # DEBUG adds per-request detail
     
     # Audio Configuration
     SAMPLE_RATE = 22050
     AUDIO_FORMAT = 'wav'
     MAX_TEXT_LENGTH = 5000
+    STREAM_CHUNK_SIZE = 16 * 1024  # Bytes per chunk when streaming audio responses
+    EDGE_TTS_CHUNK_CHARS = 400  # Longer texts are split at sentence ends and synthesized concurrently
+    EDGE_TTS_MAX_CONCURRENCY = 4  # Parallel Edge TTS connections per request
     
     # Language Configuration
     SUPPORTED_LANGUAGES = {
@@ -72,17 +101,39 @@ class Config:
     MIN_PITCH = -20
     MAX_PITCH = 20
     
+    # Concurrency Configuration
+    MAX_CONCURRENT_SYNTHESIS = max(2, (os.cpu_count() or 1) * 2)
+    SYNTHESIS_QUEUE_TIMEOUT = 5  # Seconds to wait for a free slot before returning 503
+    OFFLINE_ENGINE_POOL_SIZE = 2  # pyttsx3 worker threads, each owning one engine (offline fallback)
+    BATCH_MAX_ITEMS = 32  # Utterances accepted by one /api/generate/batch request
+    BATCH_MAX_WORKERS = 4  # Utterances of one batch synthesized at the same time
+    
     # Cache Configuration
     CACHE_DIR = os.path.join(os.path.dirname(__file__), 'cache')
     ENABLE_CACHE = True
     MAX_CACHE_SIZE_MB = 500
+    MEM_CACHE_MAX_MB = 64  # In-process LRU in front of the disk cache
+    CACHE_RESCAN_INTERVAL = 60  # Seconds before the disk cache index is resynced with the directory
+    SPEAKER_STAT_TTL = 5  # Seconds a speaker_wav stat result is reused
+    AUDIO_CACHE_MAX_AGE = 24 * 60 * 60  # Seconds clients may reuse cached audio (Cache-Control max-age)
     
     # Model Configuration
     MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
     USE_GPU = False  # Set to True if CUDA is available
+    XTTS_DTYPE = _xtts_dtype()  # auto | bfloat16 | float16 | float32 (GPU only)
+    XTTS_COMPILE = os.environ.get('XTTS_COMPILE') == '1'  # torch.compile the XTTS decoder (slow first call)
+    XTTS_COMPILE_MODE = os.environ.get('XTTS_COMPILE_MODE', 'reduce-overhead')
+    WARMUP_ON_INIT = os.environ.get('WARMUP_ON_INIT', '1') == '1'  # Load + exercise XTTS at startup
+    DEFAULT_SPEAKER_WAV = os.environ.get('DEFAULT_SPEAKER_WAV')  # Reference clip used for the warmup
     
     # Output Configuration
     OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
+    OUTPUT_MAX_AGE_SECONDS = 15 * 60  # Generated files older than this are swept
+    OUTPUT_SWEEP_INTERVAL = 60
+    
+    # File offload to a front proxy (leave unset when Flask serves files itself)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == '1'  # Apache / lighttpd
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX')  # nginx, e.g. '/internal-audio/'
     
     # Voice Profiles (Human-like settings)
     # Using Edge TTS Neural Voices
@@ -125,7 +176,6 @@ class Config:
     }
     
     # Prosody Default Settings
-    # Edge TTS supports rate and pitch changes
+    # Edge TTS supports rate and pitch changes (pitch default is DEFAULT_PITCH above)
     DEFAULT_RATE = "+0%"
-    DEFAULT_PITCH = "+0Hz"
 
@@ -0,0 +1,34 @@
+"""
+Logging setup for the TTS service.
+Request threads only enqueue records; one background thread writes them out.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+from config import Config
+
+_listener = None
+
+def configure_logging():
+    """
+    Route the root logger through a QueueHandler, like logging.basicConfig but
+    without a stderr write (and its lock) on the calling thread.
+    Does nothing if logging is already configured, e.g. by the WSGI server.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None or root.handlers:
+        return
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    records = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(Config.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued before the interpreter exits
+    atexit.register(_listener.stop)
@@ -5,7 +5,7 @@ import sys
 # Add parent directory to path so we can import api_keys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from api_keys import create_api_key, _load_keys
+from api_keys import create_api_key, _load_keys, _is_digest
 
 def init_key():
     print("Checking for existing API keys...")
@@ -13,7 +13,10 @@ def init_key():
     if keys:
         print(f"Found {len(keys)} existing keys.")
         for k, v in keys.items():
-            print(f"Key ({v.get('label', 'unknown')}): {k}")
+            if _is_digest(k):
+                print(f"Key ({v.get('label', 'unknown')}): sha256 {k[:12]}... (stored hashed, raw key not recoverable)")
+            else:
+                print(f"Key ({v.get('label', 'unknown')}): {k}")
     else:
         print("No keys found. Generating default 'admin' key...")
         key = create_api_key(label="admin")
@@ -10,12 +10,8 @@ def test_performance():
     # 1. Measure First Generation (No Cache)
     # Note: We might need to clear cache if it exists
     import os
-    from config import Config
-    config = Config()
-    import hashlib
-    key_data = f"{text}|bn|bn-IN-TanishaaNeural|1.0"
-    hash_key = hashlib.sha256(key_data.encode()).hexdigest()
-    cache_file = os.path.join(config.CACHE_DIR, f"{hash_key}.mp3")
+    hash_key = engine._cache_key(text, 'bn', 'bn-IN-TanishaaNeural', 1.0)
+    cache_file = engine._get_cache_path(hash_key, "mp3")
     
     if os.path.exists(cache_file):
         os.remove(cache_file)
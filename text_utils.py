@@ -2,6 +2,7 @@
 Text utilities for TTS normalization.
 Fixes pronunciation for brand names and expands acronyms.
 """
+import functools
 import re
 
 # Custom dictionary for brand name corrections or specific pronunciations
@@ -12,6 +13,25 @@ PRONUNCIATION_MAP = {
     "BandhaNova": "Bandha Nova",
 }
 
+# Compiled once at import instead of on every normalize_text call.
+# Longer pronunciation keys come first so a key that prefixes another cannot shadow it.
+_PRON_PATTERN = "|".join(re.escape(original) for original in sorted(PRONUNCIATION_MAP, key=len, reverse=True))
+_PRON_LOOKUP = {original.lower(): correction for original, correction in PRONUNCIATION_MAP.items()}
+# Matches words consisting only of uppercase letters A-Z
+# We use word boundaries \b to ensure we don't match parts of longer words
+_ACRONYM_PATTERN = r'\b[A-Z]{2,4}\b'
+_ACRONYM_RE = re.compile(_ACRONYM_PATTERN)
+# normalize_text does all three rewrites in one scan: pronunciation keys
+# (case-insensitive), acronyms (case-sensitive) and whitespace runs
+_FUSED_RE = re.compile(f"(?i:({_PRON_PATTERN}))|({_ACRONYM_PATTERN})|(\\s+)")
+# Shortest input a pronunciation key or acronym can match (acronyms are 2+ letters)
+_MIN_MATCH_LEN = min([2] + [len(original) for original in PRONUNCIATION_MAP])
+# Sentence ends: . ! ? followed by whitespace, or the Indic danda / double danda
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+|(?<=[।॥])\s*')
+# Inputs up to this length are memoized; repeated phrases (greetings, UI prompts)
+# skip the regex pass, while long one-off texts do not fill the cache
+_MEMO_MAX_LEN = 512
+
 def expand_acronyms(text):
     """
     Finds uppercase acronyms (2-4 chars) and inserts spaces between letters
@@ -25,9 +45,7 @@ def expand_acronyms(text):
             return " ".join(list(acronym))
         return acronym
 
-    # Regex matches words consisting only of uppercase letters A-Z
-    # We use word boundaries \b to ensure we don't match parts of longer words
-    return re.sub(r'\b[A-Z]{2,4}\b', spacing_replacer, text)
+    return _ACRONYM_RE.sub(spacing_replacer, text)
 
 def normalize_text(text, language='en'):
     """
@@ -35,18 +53,48 @@ def normalize_text(text, language='en'):
     """
     if not text:
         return text
+    if len(text) < _MIN_MATCH_LEN:
+        # Too short for any pronunciation key or acronym; only whitespace can change
+        return text.strip()
+    if len(text) <= _MEMO_MAX_LEN:
+        return _normalize_memo(text)
+    return _normalize(text)
 
-    # 1. Apply custom pronunciation map (case-insensitive search)
-    # We use a case-insensitive regex for each key in PRONUNCIATION_MAP
-    for original, correction in PRONUNCIATION_MAP.items():
-        pattern = re.compile(re.escape(original), re.IGNORECASE)
-        text = pattern.sub(correction, text)
+@functools.lru_cache(maxsize=4096)
+def _normalize_memo(text):
+    return _normalize(text)
 
-    # 2. Expand acronyms for English words
-    # Even in Bengali text, English abbreviations might appear
-    text = expand_acronyms(text)
+def _normalize(text):
+    # One pass applies, in order of appearance:
+    # 1. The custom pronunciation map (case-insensitive)
+    # 2. Acronym expansion; even in Bengali text, English abbreviations might appear
+    # 3. Collapsing whitespace runs to a single space
+    return _FUSED_RE.sub(_fused_replacer, text).strip()
 
-    # 3. Handle double spaces that might have been introduced
-    text = re.sub(r'\s+', ' ', text).strip()
+def _fused_replacer(match):
+    pron, acronym, _ = match.groups()
+    if pron is not None:
+        return _PRON_LOOKUP[pron.lower()]
+    if acronym is not None:
+        return " ".join(acronym)
+    return " "
 
-    return text
+def split_sentences(text, max_chars=400):
+    """
+    Split text at sentence ends and pack consecutive sentences into chunks
+    of at most max_chars, so each chunk can be synthesized independently.
+    A single sentence longer than max_chars is kept whole.
+    """
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
@@ -3,257 +3,795 @@ Alternative TTS Engine using gTTS and pyttsx3
 Compatible with Python 3.12+
 """
 import os
+import atexit
 import logging
+import gtts.tts
+import requests
 from gtts import gTTS
 import pyttsx3
+import numpy as np
+import soundfile as sf
 import asyncio
 import hashlib
+import io
+import importlib.util
+import queue
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-from text_utils import normalize_text
+from log_utils import configure_logging
+from text_utils import normalize_text, split_sentences
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Edge TTS runs in-process; whether the library is installed is decided once, at import
+try:
+    import edge_tts
+    EDGE_TTS_OK = True
+except ImportError as e:
+    edge_tts = None
+    EDGE_TTS_OK = False
+    _EDGE_TTS_IMPORT_ERROR = e
+
+# Our language codes -> gTTS language codes
+_GTTS_LANG_MAP = {
+    'bn': 'bn', 'hi': 'hi', 'mr': 'mr', 'gu': 'gu', 'kn': 'kn',
+    'ml': 'ml', 'ta': 'ta', 'te': 'te', 'en': 'en'
+}
+
+class _KeepAliveSession(requests.Session):
+    """requests.Session that stays open when used as a context manager"""
+    def __exit__(self, *args):
+        pass
+
+class _SharedSessionRequests:
+    """Stand-in for the requests module inside gtts.tts whose Session() is one pooled session"""
+    def __init__(self, session):
+        self._session = session
+    
+    def Session(self):
+        return self._session
+    
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+# gTTS opens a new requests.Session, and so a new TLS connection, for every chunk it
+# sends. Hand it one keep-alive session instead so connections to Google are reused
+_GTTS_SESSION = _KeepAliveSession()
+_GTTS_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=Config.MAX_CONCURRENT_SYNTHESIS))
+if getattr(gtts.tts, "requests", None) is requests:
+    gtts.tts.requests = _SharedSessionRequests(_GTTS_SESSION)
+atexit.register(requests.Session.close, _GTTS_SESSION)
+
+# BLAKE3 is SIMD-accelerated; BLAKE2b produces a digest of the same length without it.
+# Either way the key is 32 hex characters; switching backends only changes which files are found
+try:
+    import blake3
+    
+    def _fast_hash(data):
+        return blake3.blake3(data).hexdigest(length=16)
+except ImportError:
+    def _fast_hash(data):
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+# Marks the end of a streamed synthesis on the producer/consumer queue
+_STREAM_END = object()
+
+# Shape of a key from _cache_key (32 lowercase hex characters)
+_CACHE_KEY_RE = re.compile(r"[0-9a-f]{32}")
+
+# Extensions a cache entry may have: XTTS produces WAV, Edge TTS produces MP3
+_CACHE_FORMATS = (("mp3", "audio/mpeg"), ("wav", "audio/wav"))
+
+_dirs_ready = False
+
+def _ensure_dirs(config):
+    """Create the cache and output directories once per process"""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    if config.ENABLE_CACHE:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+    os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+    _dirs_ready = True
+
+# speaker_wav path -> (checked_at, os.stat_result or None), least recently used first
+_SPEAKER_STATS = OrderedDict()
+_SPEAKER_STATS_MAX = 128
+_SPEAKER_STATS_LOCK = threading.Lock()
+
+# Helper threads for generate_speech_batch. Callers bound their own share with
+# max_workers, so together they stay within MAX_CONCURRENT_SYNTHESIS
+_BATCH_POOL = ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_SYNTHESIS, thread_name_prefix="tts-batch")
+
+# Eviction trims the disk cache to this fraction of MAX_CACHE_SIZE_MB
+_CACHE_LOW_WATER = 0.9
+
+# Entries kept in TTSEngine._raw_keys
+_RAW_KEYS_MAX = 4096
+
+def _speaker_stat(path, ttl):
+    """os.stat a reference clip, reusing the result for ttl seconds; None if it is missing"""
+    now = time.monotonic()
+    with _SPEAKER_STATS_LOCK:
+        hit = _SPEAKER_STATS.get(path)
+        if hit is not None and now - hit[0] < ttl:
+            _SPEAKER_STATS.move_to_end(path)
+            return hit[1]
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+    with _SPEAKER_STATS_LOCK:
+        _SPEAKER_STATS[path] = (now, st)
+        _SPEAKER_STATS.move_to_end(path)
+        while len(_SPEAKER_STATS) > _SPEAKER_STATS_MAX:
+            _SPEAKER_STATS.popitem(last=False)
+    return st
+
+def _log_write_failure(future):
+    if future.exception() is not None:
+        logger.warning(f"Could not save to cache: {future.exception()}")
+
 class TTSEngine:
     def __init__(self):
         """Initialize TTS Engine with Edge TTS (primary), gTTS (secondary), and pyttsx3 (offline)"""
         self.config = Config()
         
-        # Initialize Coqui TTS (XTTS v2)
-        try:
-            from TTS.api import TTS
-            logger.info("Initializing Coqui TTS (XTTS v2)... this may take a while first time.")
-            # Use the first supported language's model or default to xtts_v2
-            model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
-            self.xtts = TTS(model_name=model_name, progress_bar=False, gpu=self.config.USE_GPU)
-            logger.info("Coqui TTS (XTTS v2) initialized successfully!")
-        except Exception as e:
-            logger.warning(f"Coqui TTS (XTTS) initialization failed: {e}. Voice cloning will be disabled.")
-            self.xtts = None
+        # Coqui TTS (XTTS v2) is a multi-GB torch model, so it is loaded on
+        # first use (see the xtts property) rather than at startup
+        self._xtts = None
+        self._xtts_failed = importlib.util.find_spec("TTS") is None
+        self._xtts_lock = threading.Lock()
+        self._xtts_dtype = None
 
+        # Async work (Edge TTS) runs on one long-lived loop instead of asyncio.run per call
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        
         # Check for Edge TTS
-        import shutil
-        import sys
+        self._edge_tts = edge_tts
+        self.edge_tts_available = EDGE_TTS_OK
+        self.edge_tts_via_module = EDGE_TTS_OK
+        if EDGE_TTS_OK:
+            logger.info(f"✓ Edge TTS (Neural) available via direct import: edge_tts v{getattr(edge_tts, '__version__', 'unknown')}")
+        else:
+            logger.warning(f"✗ Edge TTS not available ({_EDGE_TTS_IMPORT_ERROR}). Human-like voices will NOT work! Install with: pip install edge-tts")
+
+        # pyttsx3 runs on its own worker threads, each creating and keeping one engine
+        # on first use (see _offline_engine), so an engine never changes threads
+        self._offline_executor = ThreadPoolExecutor(
+            max_workers=self.config.OFFLINE_ENGINE_POOL_SIZE, thread_name_prefix="pyttsx3"
+        )
+        self._offline_tls = threading.local()
+        self._offline_failed = False
+
+        # Prepare cache and output directories
+        _ensure_dirs(self.config)
         
-        # Method 1: Try importing edge_tts module directly (most reliable)
-        try:
-            import edge_tts
-            self.edge_tts_via_module = True
-            self.edge_tts_available = True
-            logger.info(f"✓ Edge TTS (Neural) available via direct import: edge_tts v{edge_tts.__version__ if hasattr(edge_tts, '__version__') else 'unknown'}")
-        except ImportError as e:
-            logger.warning(f"Edge TTS module import failed: {e}")
-            
-            # Method 2: Check CLI
-            self.edge_tts_path = shutil.which("edge-tts")
+        # Disk cache index (path -> size, least recently used first) and its total.
+        # Worker processes share CACHE_DIR, so recency is also kept in the files'
+        # atimes (refreshed on hits): a rescan rebuilds the same order every worker
+        # sees, and no separate index file has to be persisted and kept in sync
+        self._cache_index = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_fresh = {}  # Written since the current scan started
+        self._cache_unscanned_bytes = 0
+        self._cache_last_scan = None  # time.monotonic() of the last scan; None before the first
+        self._cache_maintenance_pending = False
+        self._cache_lock = threading.Lock()
+        
+        # Cache writes that nobody waits on go through one background thread; its
+        # queue is drained before the interpreter exits
+        self._cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+        
+        # Hot results are also kept in memory (cache key -> (bytes, mimetype)), oldest first
+        self._mem_cache = OrderedDict()
+        self._mem_cache_bytes = 0
+        self._mem_lock = threading.Lock()
+        
+        # Cache key of the raw request text -> cache key of its normalized form,
+        # so repeated requests can hit the caches without normalizing again
+        self._raw_keys = OrderedDict()
+        self._raw_keys_lock = threading.Lock()
             
-            # Method 3: Check in current python environment via subprocess
-            if not self.edge_tts_path:
-                try:
-                    import subprocess
-                    result = subprocess.run([sys.executable, "-m", "edge_tts", "--version"], capture_output=True, check=True, text=True)
-                    self.edge_tts_via_module = True
-                    self.edge_tts_available = True
-                    logger.info(f"✓ Edge TTS (Neural) available via module: {sys.executable} -m edge_tts")
-                    logger.info(f"  Version check output: {result.stdout.strip()}")
-                except Exception as ex:
-                    self.edge_tts_via_module = False
-                    self.edge_tts_available = False
-                    logger.error(f"✗ Edge TTS not found in PATH or as module. Human-like voices will NOT work!")
-                    logger.error(f"  Detection error: {ex}")
-                    logger.error(f"  Install with: pip install edge-tts")
-            else:
-                self.edge_tts_via_module = False
-                self.edge_tts_available = True
-                logger.info(f"✓ Edge TTS (Neural) available via CLI: {self.edge_tts_path}")
-
-        # Initialize pyttsx3 for offline TTS
+        logger.info("TTS Engine initialized successfully!")
+    
+    def warmup(self):
+        """
+        Load XTTS and run one throwaway synthesis so kernels and caches are ready.
+        Slow, so it is run once the engine is already serving requests (see app._warm_engine).
+        """
+        speaker_wav = self.config.DEFAULT_SPEAKER_WAV
+        if not speaker_wav or not os.path.isfile(speaker_wav) or not self.xtts:
+            return
         try:
-            self.offline_engine = pyttsx3.init()
-            self.offline_available = True
-            logger.info("Offline TTS engine initialized")
+            start = time.perf_counter()
+            self._xtts_wav_bytes("Warm up.", speaker_wav, "en", 1.0)
+            import torch
+            if torch.cuda.is_available():
+                # Hand the warmup's transient allocations back to the driver
+                torch.cuda.empty_cache()
+            logger.info(f"🔥 XTTS warmed up in {time.perf_counter() - start:.2f}s")
         except Exception as e:
-            logger.warning(f"Offline TTS not available: {e}")
-            self.offline_available = False
-        # Prepare cache directory
-        if self.config.ENABLE_CACHE:
-            os.makedirs(self.config.CACHE_DIR, exist_ok=True)
+            logger.warning(f"XTTS warmup failed: {e}")
+    
+    @property
+    def xtts(self):
+        """Coqui XTTS v2 model, loaded on first access; None if unavailable"""
+        if self._xtts is None and not self._xtts_failed:
+            with self._xtts_lock:
+                if self._xtts is None and not self._xtts_failed:
+                    try:
+                        from TTS.api import TTS
+                        logger.info("Initializing Coqui TTS (XTTS v2)... this may take a while first time.")
+                        # Use the first supported language's model or default to xtts_v2
+                        model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
+                        model = TTS(model_name=model_name, progress_bar=False, gpu=self.config.USE_GPU)
+                        self._prepare_xtts(model)
+                        self._xtts = model
+                        logger.info("Coqui TTS (XTTS v2) initialized successfully!")
+                    except Exception as e:
+                        logger.warning(f"Coqui TTS (XTTS) initialization failed: {e}. Voice cloning will be disabled.")
+                        self._xtts_failed = True
+        return self._xtts
+    
+    def _prepare_xtts(self, model):
+        """Optionally compile the XTTS decoder, and cast to half precision on a CUDA GPU"""
+        import torch
+        if self.config.XTTS_COMPILE:
+            # Only modules reached through __call__ benefit; the HiFi-GAN decoder is,
+            # while the GPT stage is driven through .generate() and stays eager
+            tts_model = model.synthesizer.tts_model
+            try:
+                tts_model.hifigan_decoder = torch.compile(
+                    tts_model.hifigan_decoder, mode=self.config.XTTS_COMPILE_MODE, dynamic=True
+                )
+                logger.info(f"XTTS decoder compiled (mode={self.config.XTTS_COMPILE_MODE})")
+            except Exception as e:
+                logger.warning(f"torch.compile unavailable for XTTS, running eagerly: {e}")
+        dtype_name = self.config.XTTS_DTYPE
+        if dtype_name == 'float32' or not (self.config.USE_GPU and torch.cuda.is_available()):
+            return
+        if dtype_name == 'auto':
+            # BF16 keeps FP32's exponent range (Ampere and newer); FP16 otherwise
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        else:
+            dtype = getattr(torch, dtype_name)
+        self._cast_xtts(model, dtype)
+        self._xtts_dtype = dtype
+        logger.info(f"XTTS running in {str(dtype).replace('torch.', '')}")
+    
+    def _cast_xtts(self, model, dtype):
+        """Cast the acoustic model, and the separate vocoder if the model has one"""
+        synthesizer = model.synthesizer
+        synthesizer.tts_model.to(dtype=dtype)
+        vocoder = getattr(synthesizer, "vocoder_model", None)
+        if vocoder is not None:
+            vocoder.to(dtype=dtype)
+    
+    def _run_xtts(self, synthesize, is_valid=lambda result: True):
+        """
+        Run one XTTS call, dropping back to FP32 once if half precision fails.
+        
+        Args:
+            synthesize: Callable doing the XTTS call inside _xtts_inference
+            is_valid: Check on the result, e.g. that the waveform has no NaN/inf
             
-        logger.info("TTS Engine initialized successfully!")
+        Returns:
+            Whatever synthesize returns
+        """
+        if self._xtts_dtype is None:
+            return synthesize()
+        try:
+            result = synthesize()
+            if is_valid(result):
+                return result
+            reason = "non-finite samples"
+        except RuntimeError as e:
+            reason = e
+        with self._xtts_lock:
+            if self._xtts_dtype is not None:
+                import torch
+                # Some speaker clips overflow the speaker encoder at reduced precision
+                logger.warning(f"XTTS {str(self._xtts_dtype).replace('torch.', '')} output unusable ({reason}); switching to float32")
+                self._cast_xtts(self._xtts, torch.float32)
+                self._xtts_dtype = None
+        return synthesize()
+    
+    def _xtts_inference(self):
+        """Context for XTTS calls: no autograd bookkeeping, plus autocast when the model is half precision"""
+        import contextlib
+        import torch
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self._xtts_dtype is not None:
+            stack.enter_context(torch.autocast("cuda", dtype=self._xtts_dtype))
+        return stack
+    
+    @property
+    def xtts_available(self):
+        """Whether XTTS can be used, without forcing the model to load"""
+        return not self._xtts_failed
+    
+    def _offline_engine(self):
+        """This worker thread's pyttsx3 engine, created on first use"""
+        engine = getattr(self._offline_tls, "engine", None)
+        if engine is None:
+            try:
+                if os.name == "nt":
+                    # SAPI5 engines are COM objects tied to the apartment of the creating thread
+                    import pythoncom
+                    pythoncom.CoInitialize()
+                # pyttsx3.init() hands back one shared engine per driver, so each
+                # thread constructs its own
+                engine = pyttsx3.Engine()
+            except Exception as e:
+                logger.warning(f"Offline TTS not available: {e}")
+                self._offline_failed = True
+                raise
+            self._offline_tls.engine = engine
+            logger.info(f"Offline TTS engine initialized on {threading.current_thread().name}")
+        return engine
+    
+    def _offline_synthesize(self, text, output_path):
+        engine = self._offline_engine()
+        engine.save_to_file(text, output_path)
+        engine.runAndWait()
+    
+    @property
+    def offline_available(self):
+        """Whether pyttsx3 can be used, without forcing it to initialize"""
+        return not self._offline_failed
+    
+    def _cache_key(self, text, language, voice_id, speed, speaker_wav=None):
+        """Return the cache key (128-bit hex digest) for one synthesis request"""
+        speaker = ""
+        if speaker_wav:
+            # Include mtime+size so re-recording the reference clip invalidates old audio
+            st = _speaker_stat(speaker_wav, self.config.SPEAKER_STAT_TTL)
+            speaker = f"{speaker_wav}:{st.st_mtime_ns}:{st.st_size}" if st else speaker_wav
+        key_data = f"{text}|{self._get_gtts_lang_code(language)}|{voice_id or 'default'}|{speaker}|{round(speed, 2)}"
+        # Not a security boundary, so a fast 128-bit hash is enough
+        return _fast_hash(key_data.encode())
+    
+    def _resolve_cache_key(self, text, language, voice_id, speed, speaker_wav=None):
+        """
+        Cache key for raw request text, normalizing only the first time the text is seen.
+        
+        Returns:
+            (cache_key, normalized_text); normalized_text is None if normalization was skipped
+        """
+        raw_key = self._cache_key(text, language, voice_id, speed, speaker_wav)
+        with self._raw_keys_lock:
+            cache_key = self._raw_keys.get(raw_key)
+            if cache_key is not None:
+                self._raw_keys.move_to_end(raw_key)
+                return cache_key, None
+        normalized_text = normalize_text(text, language)
+        if normalized_text == text:
+            cache_key = raw_key
+        else:
+            cache_key = self._cache_key(normalized_text, language, voice_id, speed, speaker_wav)
+        with self._raw_keys_lock:
+            self._raw_keys[raw_key] = cache_key
+            while len(self._raw_keys) > _RAW_KEYS_MAX:
+                self._raw_keys.popitem(last=False)
+        return cache_key, normalized_text
+    
+    def _get_cache_path(self, cache_key, ext="mp3"):
+        """Disk cache filename for a key from _cache_key, sharded as CACHE_DIR/ab/abcd....ext"""
+        return os.path.join(self.config.CACHE_DIR, cache_key[:2], f"{cache_key}.{ext}")
+    
+    def _find_cached(self, cache_key):
+        """Return (cache_path, mimetype) for a cached result on disk, or None"""
+        for ext, mimetype in _CACHE_FORMATS:
+            cache_path = self._get_cache_path(cache_key, ext)
+            try:
+                st = os.stat(cache_path)
+            except OSError:
+                continue
+            self._touch_cache_entry(cache_path, st)
+            return cache_path, mimetype
+        return None
+    
+    def _touch_cache_entry(self, cache_path, st):
+        """Mark a disk cache file as most recently used, here and for rescans/other workers"""
+        with self._cache_lock:
+            if cache_path in self._cache_index:
+                self._cache_index.move_to_end(cache_path)
+        # atime is set explicitly (keeping mtime, the Last-Modified), so noatime/relatime
+        # mounts do not matter; a rescan orders entries by it
+        try:
+            os.utime(cache_path, ns=(time.time_ns(), st.st_mtime_ns))
+        except OSError:
+            pass
+    
+    def find_cached(self, text, language='en', speed=1.0, voice_id=None):
+        """
+        Look up finished audio for a request on disk, without synthesizing.
+        
+        Returns:
+            (cache_path, mimetype), or None if nothing is cached
+        """
+        if not self.config.ENABLE_CACHE or not text or text.isspace():
+            return None
+        cache_key, _ = self._resolve_cache_key(text, language, voice_id, speed)
+        return self._find_cached(cache_key)
+    
+    def cached_file(self, cache_key):
+        """(cache_path, mimetype) for a cache key handed out by cache_key_of, or None"""
+        if not self.config.ENABLE_CACHE or not _CACHE_KEY_RE.fullmatch(cache_key):
+            return None
+        return self._find_cached(cache_key)
+    
+    def cache_key_of(self, path):
+        """Cache key of a file returned by generate_speech/find_cached, or None if it is not a cache file"""
+        if os.path.dirname(os.path.dirname(path)) != self.config.CACHE_DIR:
+            return None
+        cache_key = os.path.splitext(os.path.basename(path))[0]
+        return cache_key if _CACHE_KEY_RE.fullmatch(cache_key) else None
+    
+    def _cache_get(self, cache_key):
+        """Return (audio_bytes, mimetype) from the in-memory LRU, or None"""
+        with self._mem_lock:
+            hit = self._mem_cache.get(cache_key)
+            if hit is not None:
+                self._mem_cache.move_to_end(cache_key)
+            return hit
+    
+    def _cache_put(self, cache_key, audio_bytes, mimetype):
+        """Insert into the in-memory LRU, evicting the oldest entries beyond MEM_CACHE_MAX_MB"""
+        limit = self.config.MEM_CACHE_MAX_MB * 1024 * 1024
+        if len(audio_bytes) > limit:
+            return
+        with self._mem_lock:
+            old = self._mem_cache.pop(cache_key, None)
+            if old is not None:
+                self._mem_cache_bytes -= len(old[0])
+            self._mem_cache[cache_key] = (audio_bytes, mimetype)
+            self._mem_cache_bytes += len(audio_bytes)
+            while self._mem_cache_bytes > limit:
+                _, (evicted, _) = self._mem_cache.popitem(last=False)
+                self._mem_cache_bytes -= len(evicted)
+    
+    def _save_to_cache(self, cache_path, audio_bytes, wait=True):
+        """
+        Store audio in the disk cache.
+        
+        Args:
+            cache_path: Destination from _get_cache_path
+            audio_bytes: Encoded audio
+            wait: Write before returning; pass False when the caller does not need
+                the file itself, and the single cache-writer thread does it instead
+        """
+        if wait:
+            self._write_cache_file(cache_path, audio_bytes)
+            return
+        future = self._cache_writer.submit(self._write_cache_file, cache_path, audio_bytes)
+        future.add_done_callback(_log_write_failure)
+    
+    def _write_cache_file(self, cache_path, audio_bytes):
+        """Write atomically (temp file + os.replace) so readers never see a partial file"""
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio_bytes)
+        os.replace(tmp_path, cache_path)
+        logger.debug("💾 Saved to cache: %s", cache_path)
+        
+        # The entry is usable now; size bookkeeping must never fail the synthesis
+        try:
+            self._account_cache_write(cache_path, len(audio_bytes))
+        except Exception as e:
+            logger.warning(f"Cache size bookkeeping failed: {e}")
+    
+    def _account_cache_write(self, cache_path, size):
+        """Add a written file to the index and queue maintenance on the cache-writer thread if due"""
+        limit = self.config.MAX_CACHE_SIZE_MB * 1024 * 1024
+        with self._cache_lock:
+            self._cache_bytes += size - self._cache_index.pop(cache_path, 0)
+            self._cache_index[cache_path] = size
+            self._cache_fresh[cache_path] = size
+            self._cache_unscanned_bytes += size
+            if self._cache_maintenance_pending:
+                return
+            if not (self._cache_bytes > limit or self._rescan_due(limit)):
+                return
+            self._cache_maintenance_pending = True
+        self._cache_writer.submit(self._maintain_cache)
+    
+    def _rescan_due(self, limit):
+        """Whether the index may have drifted from the directory; call with _cache_lock held"""
+        return (self._cache_last_scan is None
+                or self._cache_unscanned_bytes > limit // 4
+                or time.monotonic() - self._cache_last_scan > self.config.CACHE_RESCAN_INTERVAL)
+    
+    def _maintain_cache(self):
+        """Resync the index with CACHE_DIR when due, then evict if over budget (cache-writer thread)"""
+        limit = self.config.MAX_CACHE_SIZE_MB * 1024 * 1024
+        try:
+            with self._cache_lock:
+                rescan = self._rescan_due(limit)
+                if rescan:
+                    self._cache_fresh = {}
+                    self._cache_unscanned_bytes = 0
+                    self._cache_last_scan = time.monotonic()
+            if rescan:
+                # Other workers write and evict in the same directory
+                index = self._scan_cache_dir()
+                with self._cache_lock:
+                    # Files written while the scan ran may be missing from it; they are the newest
+                    for path, size in self._cache_fresh.items():
+                        index.pop(path, None)
+                        index[path] = size
+                    self._cache_index = index
+                    self._cache_bytes = sum(index.values())
+            if self._cache_bytes > limit:
+                # Trim below the limit so the next few writes do not trigger another pass
+                self._evict_cache(int(limit * _CACHE_LOW_WATER))
+        except Exception as e:
+            logger.warning(f"Cache maintenance failed: {e}")
+        finally:
+            with self._cache_lock:
+                self._cache_maintenance_pending = False
     
-    def _get_cache_path(self, text, language, voice_id, speed):
-        """Generate a unique cache filename based on request parameters"""
-        # Create a unique key string
-        key_data = f"{text}|{language}|{voice_id}|{speed}"
-        # Use SHA-256 hash for the filename
-        hash_key = hashlib.sha256(key_data.encode()).hexdigest()
-        return os.path.join(self.config.CACHE_DIR, f"{hash_key}.mp3")
+    def _scan_cache_dir(self):
+        """Return an OrderedDict of path -> size for finished cache files, oldest atime first"""
+        entries = []
+        pending = [self.config.CACHE_DIR]
+        while pending:
+            try:
+                it = os.scandir(pending.pop())
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    # Other workers evict from the same directory while we scan
+                    try:
+                        if entry.is_dir():
+                            pending.append(entry.path)
+                        elif entry.is_file() and not entry.name.endswith(".tmp"):
+                            st = entry.stat()
+                            entries.append((st.st_atime, entry.path, st.st_size))
+                    except FileNotFoundError:
+                        continue
+        entries.sort()
+        return OrderedDict((path, size) for _, path, size in entries)
+    
+    def _evict_cache(self, target):
+        """Delete least recently used files until the index totals at most target bytes"""
+        victims = []
+        with self._cache_lock:
+            while self._cache_bytes > target and self._cache_index:
+                path, size = self._cache_index.popitem(last=False)
+                self._cache_bytes -= size
+                victims.append((path, size))
+        # Unlink outside the lock so cache hits are not held up
+        kept = []
+        for path, size in victims:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already evicted by another worker
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict cache file {path}: {e}")
+                kept.append((path, size))
+        with self._cache_lock:
+            # Files that could not be removed still take up space; try them again last
+            for path, size in kept:
+                self._cache_index[path] = size
+                self._cache_bytes += size
+            logger.debug("🧹 Cache trimmed to %.1f MB", self._cache_bytes / (1024 * 1024))
+
+    def _xtts_wav_bytes(self, text, speaker_wav, language, speed):
+        """Clone a voice with XTTS and return the result as WAV bytes"""
+        def synthesize():
+            with self._xtts_inference():
+                wav = self.xtts.tts(
+                    text=text,
+                    speaker_wav=speaker_wav,
+                    language=language,
+                    speed=speed,
+                    split_sentences=True
+                )
+            return np.asarray(wav, dtype=np.float32)
+        
+        wav = self._run_xtts(synthesize, lambda wav: bool(np.isfinite(wav).all()))
+        buf = io.BytesIO()
+        sf.write(buf, wav, self.xtts.synthesizer.output_sample_rate, format="WAV")
+        return buf.getvalue()
+    
+    def _get_loop(self):
+        """Event loop running in a daemon thread, started on first use and shared by all Edge calls"""
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="tts-event-loop", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+    
+    def _run_coro(self, coro):
+        """Run a coroutine on the shared loop and wait for its result; callable from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
 
     def _get_gtts_lang_code(self, language):
         """Map our language codes to gTTS language codes"""
-        lang_map = {
-            'bn': 'bn', 'hi': 'hi', 'mr': 'mr', 'gu': 'gu', 'kn': 'kn',
-            'ml': 'ml', 'ta': 'ta', 'te': 'te', 'en': 'en'
-        }
-        return lang_map.get(language, 'en')
+        gtts_lang = _GTTS_LANG_MAP.get(language)
+        if gtts_lang is None:
+            # Regional tags such as en-US / en_IN fall back to their base language
+            gtts_lang = _GTTS_LANG_MAP.get(str(language).replace('_', '-').split('-')[0].lower(), 'en')
+        return gtts_lang
 
-    def generate_speech(self, text, language='en', speed=1.0, voice_id=None, speaker_wav=None, output_path=None, return_bytes=False):
+    def generate_speech(self, text, language='en', speed=1.0, voice_id=None, speaker_wav=None, output_path=None, return_bytes=False, return_path=False):
         """
         Generate speech using XTTS (if speaker_wav), Edge TTS (if voice_id), or gTTS (fallback)
         If return_bytes is True, returns (audio_bytes, mimetype) instead of file path.
+        If return_path is True, writes to a uniquely named file in OUTPUT_DIR (or returns
+        the cache file on a hit) so the caller can serve it with send_file.
         """
-        if not text or len(text.strip()) == 0:
+        if not text or text.isspace():
             raise ValueError("Text cannot be empty")
         
-        # --- NEW: Normalization ---
-        normalized_text = normalize_text(text, language)
-        if normalized_text != text:
-            text = normalized_text
-        
         # --- NEW: Caching Check ---
+        # Text seen before resolves to its cache key without being normalized again
+        cache_key = normalized_text = None
         if self.config.ENABLE_CACHE:
-            cache_path = self._get_cache_path(text, language, voice_id, speed)
-            if os.path.exists(cache_path):
-                logger.info(f"⚡ Cache hit! Returning pre-generated audio for: {text[:20]}...")
-                with open(cache_path, "rb") as f:
-                    audio_bytes = f.read()
+            cache_key, normalized_text = self._resolve_cache_key(text, language, voice_id, speed, speaker_wav)
+            if return_bytes:
+                hit = self._cache_get(cache_key)
+                if hit is not None:
+                    logger.debug("⚡ Memory cache hit! Returning pre-generated audio for: %s...", text[:20])
+                    return hit
+            cached = self._find_cached(cache_key)
+            if cached:
+                cache_path, mimetype = cached
+                logger.debug("⚡ Cache hit! Returning pre-generated audio for: %s...", text[:20])
                 if return_bytes:
-                    return audio_bytes, "audio/mpeg"
+                    with open(cache_path, "rb") as f:
+                        audio_bytes = f.read()
+                    self._cache_put(cache_key, audio_bytes, mimetype)
+                    return audio_bytes, mimetype
                 
                 # If path requested but we found in cache, we need to copy to output if different
                 if output_path and output_path != cache_path:
-                    import shutil
                     shutil.copy2(cache_path, output_path)
                     return output_path
                 return cache_path
 
+        # --- NEW: Normalization ---
+        if normalized_text is None:
+            normalized_text = normalize_text(text, language)
+        text = normalized_text
+
         if len(text) > self.config.MAX_TEXT_LENGTH:
             raise ValueError(f"Text too long. Maximum {self.config.MAX_TEXT_LENGTH} characters allowed")
         
         # Generate output path if not provided and not returning bytes
+        path_generated = output_path is None
         if output_path is None and not return_bytes:
-            import time
-            timestamp = int(time.time())
-            ext = "wav" if (self.xtts and speaker_wav) else "mp3"
-            output_path = os.path.join(
-                self.config.OUTPUT_DIR, 
-                f"tts_{language}_{timestamp}.{ext}"
-            )
+            ext = "wav" if (speaker_wav and self.xtts_available) else "mp3"
+            if return_path:
+                filename = f"{uuid.uuid4().hex}.{ext}"
+            else:
+                timestamp = int(time.time())
+                filename = f"tts_{language}_{timestamp}.{ext}"
+            output_path = os.path.join(self.config.OUTPUT_DIR, filename)
         
         # 1. Try XTTS (Zero-Shot Cloning) if speaker_wav provided
-        if self.xtts and speaker_wav and os.path.exists(speaker_wav):
+        if speaker_wav and _speaker_stat(speaker_wav, self.config.SPEAKER_STAT_TTL) and self.xtts:
             try:
-                temp_path = output_path
-                if return_bytes:
-                    import tempfile
-                    fd, temp_path = tempfile.mkstemp(suffix=".wav")
-                    os.close(fd)
+                logger.debug("🎤 Using XTTS voice cloning for %s with %s", language, os.path.basename(speaker_wav))
+                if return_bytes or (return_path and self.config.ENABLE_CACHE):
+                    # Synthesize to a waveform and encode in memory; the only disk write
+                    # is the cache entry, which is also what path-mode callers are given
+                    audio_bytes = self._xtts_wav_bytes(text, speaker_wav, language, speed)
+                    logger.debug("✓ XTTS cloning successful (%s bytes)", len(audio_bytes))
+                    return self._finalize(audio_bytes, "audio/wav", cache_key, output_path, return_bytes, return_path, path_generated)
                 
-                logger.info(f"🎤 Using XTTS voice cloning for {language} with {os.path.basename(speaker_wav)}")
-                self.xtts.tts_to_file(
-                    text=text,
-                    file_path=temp_path,
-                    speaker_wav=speaker_wav,
-                    language=language,
-                    speed=speed,
-                    split_sentences=True
-                )
-                logger.info(f"✓ XTTS cloning successful: {temp_path}")
+                # An explicit output_path (or caching disabled): write the file directly
+                def synthesize():
+                    with self._xtts_inference():
+                        self.xtts.tts_to_file(
+                            text=text,
+                            file_path=output_path,
+                            speaker_wav=speaker_wav,
+                            language=language,
+                            speed=speed,
+                            split_sentences=True
+                        )
                 
-                if return_bytes:
-                    with open(temp_path, "rb") as f:
-                        audio_bytes = f.read()
-                    os.remove(temp_path)
-                    
-                    # Save to cache if enabled
-                    if self.config.ENABLE_CACHE:
-                        cache_path = self._get_cache_path(text, language, voice_id, speed)
-                        with open(cache_path, "wb") as f:
-                            f.write(audio_bytes)
-                            
-                    return audio_bytes, "audio/wav"
+                self._run_xtts(synthesize)
+                logger.debug("✓ XTTS cloning successful: %s", output_path)
+                
+                if self.config.ENABLE_CACHE:
+                    with open(output_path, "rb") as f:
+                        self._save_to_cache(self._get_cache_path(cache_key, "wav"), f.read(), wait=False)
                 
-                return temp_path
+                return output_path
             except Exception as e:
                 logger.error(f"✗ XTTS generation failed: {e}. Falling back to Edge TTS/gTTS...")
         
         # 2. Try Edge TTS (Neural Voices)
         if voice_id and self.edge_tts_available:
             try:
-                import edge_tts
-                logger.info(f"🎙️  Using Edge TTS (Library) for {language}")
-                
                 # Calculate rate string
                 rate_pct = int((speed - 1.0) * 100)
                 rate_str = f"{'+' if rate_pct >= 0 else ''}{rate_pct}%"
                 
+                logger.debug("🎙️  Using Edge TTS (Library) for %s", language)
+                
                 # Run async call in sync context
-                async def _generate_edge():
-                    communicate = edge_tts.Communicate(text, voice_id, rate=rate_str)
-                    audio_data = b""
-                    async for chunk in communicate.stream():
-                        if chunk["type"] == "audio":
-                            audio_data += chunk["data"]
-                    return audio_data
-
-                audio_content = asyncio.run(_generate_edge())
+                async def _generate_edge(sentence, limit):
+                    async with limit:
+                        communicate = self._edge_tts.Communicate(sentence, voice_id, rate=rate_str)
+                        # Collect the frames and join once; bytes += would recopy the prefix per chunk
+                        return [chunk["data"] async for chunk in communicate.stream() if chunk["type"] == "audio"]
+
+                # Long texts are synthesized sentence-group by sentence-group concurrently;
+                # Edge returns bare MP3 frames, so the parts concatenate directly
+                async def _generate_all(sentences):
+                    # Cap parallel websockets so one long text can't trip Edge's throttling
+                    limit = asyncio.Semaphore(self.config.EDGE_TTS_MAX_CONCURRENCY)
+                    return await asyncio.gather(*(_generate_edge(s, limit) for s in sentences))
+
+                sentences = split_sentences(text, self.config.EDGE_TTS_CHUNK_CHARS)
+                audio_content = b"".join(part for parts in self._run_coro(_generate_all(sentences)) for part in parts)
                 
                 if not audio_content:
                     raise Exception("No audio generated by edge-tts")
 
-                # Save to cache if enabled
-                if self.config.ENABLE_CACHE:
-                    cache_path = self._get_cache_path(text, language, voice_id, speed)
-                    with open(cache_path, "wb") as f:
-                        f.write(audio_content)
-                    logger.info(f"💾 Saved to cache: {cache_path}")
-
-                if return_bytes:
-                    logger.info(f"✓ Edge TTS successful ({len(audio_content)} bytes)")
-                    return audio_content, "audio/mpeg"
-                else:
-                    with open(output_path, "wb") as f:
-                        f.write(audio_content)
-                    logger.info(f"✓ Edge TTS successful: {output_path}")
-                    return output_path
+                logger.debug("✓ Edge TTS successful (%s bytes)", len(audio_content))
+                return self._finalize(audio_content, "audio/mpeg", cache_key, output_path, return_bytes, return_path, path_generated)
                     
             except Exception as e:
                 logger.error(f"✗ Edge TTS generation FAILED: {e}")
-                logger.error(f"   Falling back to gTTS (robotic voice)...")
+                logger.error("   Falling back to gTTS (robotic voice)...")
         
         # Fallback to gTTS (Robotic/Standard)
         try:
-            logger.warning(f"⚠️  Using gTTS fallback (ROBOTIC voice) for language: {language}")
+            logger.warning("⚠️  Using gTTS fallback (ROBOTIC voice) for language: %s", language)
             if voice_id:
-                logger.warning(f"   Edge TTS was requested (voice_id={voice_id}) but unavailable!")
-            logger.info(f"   This will produce robotic-sounding speech, not human-like.")
+                logger.warning("   Edge TTS was requested (voice_id=%s) but unavailable!", voice_id)
+            logger.debug("   This will produce robotic-sounding speech, not human-like.")
             gtts_lang = self._get_gtts_lang_code(language)
             slow = speed < 0.8
-            tts = gTTS(text=text, lang=gtts_lang, slow=slow)
+            # _GTTS_LANG_MAP only yields codes gTTS supports, so skip its per-instance check
+            # (it rebuilds and formats the whole language table on every call)
+            tts = gTTS(text=text, lang=gtts_lang, slow=slow, lang_check=False)
             
+            # Fallback audio is not cached, so Edge output replaces it once Edge is back
             if return_bytes:
-                from io import BytesIO
-                fp = BytesIO()
+                fp = io.BytesIO()
                 tts.write_to_fp(fp)
-                fp.seek(0)
-                return fp.read(), "audio/mpeg"
+                return fp.getvalue(), "audio/mpeg"
             
-            # gTTS saves as mp3
+            # gTTS produces MP3. A .wav name we picked ourselves (expecting XTTS) is just
+            # renamed; only a caller who explicitly asked for WAV pays for a re-encode
+            if path_generated and output_path.endswith('.wav'):
+                output_path = output_path[:-4] + '.mp3'
             if output_path.endswith('.wav'):
-                temp_mp3 = output_path.replace('.wav', '.mp3')
-                tts.save(temp_mp3)
+                fp = io.BytesIO()
+                tts.write_to_fp(fp)
                 try:
-                    from pydub import AudioSegment
-                    msg = AudioSegment.from_mp3(temp_mp3)
-                    msg.export(output_path, format="wav")
-                    os.remove(temp_mp3)
-                except ImportError:
-                    logger.warning("pydub not found, returning mp3 instead of wav")
-                    output_path = temp_mp3
+                    self._mp3_to_wav_file(fp.getvalue(), output_path)
+                except FileNotFoundError:
+                    logger.warning("ffmpeg not found, returning mp3 instead of wav")
+                    output_path = output_path[:-4] + '.mp3'
+                    with open(output_path, "wb") as f:
+                        f.write(fp.getvalue())
             else:
                 tts.save(output_path)
             
-            logger.info(f"gTTS generation successful: {output_path}")
+            logger.debug("gTTS generation successful: %s", output_path)
             return output_path
             
         except Exception as e:
@@ -274,111 +812,213 @@ class TTSEngine:
                 return self._generate_offline(text, output_path)
             else:
                 raise
-            
-        except Exception as e:
-            logger.error(f"Error generating speech with gTTS: {e}")
-            if self.offline_available:
-                return self._generate_offline(text, output_path)
-            else:
-                raise
+
+    def _finalize(self, audio_bytes, mimetype, cache_key, output_path, return_bytes, return_path, path_generated):
+        """
+        Cache a finished synthesis and hand it back the way generate_speech was asked to.
+        
+        Returns:
+            (audio_bytes, mimetype) for return_bytes; the cache file for return_path when
+            caching; otherwise output_path, after writing the audio to it
+        """
+        ext = "wav" if mimetype == "audio/wav" else "mp3"
+        cache_path = None
+        if self.config.ENABLE_CACHE:
+            cache_path = self._get_cache_path(cache_key, ext)
+            # Path-mode callers are handed the cache file itself, so it must exist first
+            self._save_to_cache(cache_path, audio_bytes, wait=return_path)
+            self._cache_put(cache_key, audio_bytes, mimetype)
+        
+        if return_bytes:
+            return audio_bytes, mimetype
+        if return_path and cache_path:
+            # Serve the cache file directly rather than writing a second copy
+            return cache_path
+        if path_generated and not output_path.endswith(f".{ext}"):
+            # The name was picked before we knew which backend would answer
+            output_path = f"{os.path.splitext(output_path)[0]}.{ext}"
+        with open(output_path, "wb") as f:
+            f.write(audio_bytes)
+        return output_path
+
+    def _mp3_to_wav_file(self, mp3_bytes, output_path):
+        """Decode MP3 bytes to a 16-bit WAV file without a temp file"""
+        # libsndfile >= 1.1 decodes MP3 in-process; older builds raise and use ffmpeg
+        try:
+            data, sr = sf.read(io.BytesIO(mp3_bytes), dtype="float32")
+            sf.write(output_path, data, sr, subtype="PCM_16")
+            return
+        except (RuntimeError, TypeError) as e:
+            logger.debug("soundfile could not decode MP3 (%s), trying ffmpeg", e)
+        
+        import subprocess
+        if shutil.which("ffmpeg") is None:
+            raise FileNotFoundError("ffmpeg")
+        with open(output_path, "wb") as out:
+            subprocess.run(
+                ["ffmpeg", "-loglevel", "error", "-f", "mp3", "-i", "pipe:0", "-f", "wav", "pipe:1"],
+                input=mp3_bytes, stdout=out, stderr=subprocess.PIPE, check=True
+            )
 
     def _generate_offline(self, text, output_path):
         """Generate speech using offline pyttsx3 engine"""
         try:
             if not output_path.endswith('.wav'):
                 output_path = output_path.replace('.mp3', '.wav')
-            self.offline_engine.save_to_file(text, output_path)
-            self.offline_engine.runAndWait()
+            if self._offline_failed:
+                raise RuntimeError("pyttsx3 could not be initialized")
+            self._offline_executor.submit(self._offline_synthesize, text, output_path).result()
             return output_path
         except Exception as e:
             logger.error(f"Offline TTS also failed: {e}")
             raise
 
+    def _cache_stream_result(self, cache_key, parts):
+        """Store a completed MP3 stream in the disk and memory caches"""
+        if not (self.config.ENABLE_CACHE and parts):
+            return
+        try:
+            audio_bytes = b"".join(parts)
+            self._save_to_cache(self._get_cache_path(cache_key, "mp3"), audio_bytes)
+            self._cache_put(cache_key, audio_bytes, "audio/mpeg")
+        except Exception as ce:
+            logger.warning(f"Could not save stream to cache: {ce}")
+
+    def generate_speech_batch(self, items, return_path=False, max_workers=1):
+        """
+        Synthesize several utterances, up to max_workers at a time, keeping their order.
+        
+        Args:
+            items: List of dicts of generate_speech arguments (text, language, speed,
+                voice_id, speaker_wav)
+            return_path: Return file paths as generate_speech(return_path=True) does,
+                instead of (audio_bytes, mimetype)
+            max_workers: Syntheses to run at once, including the calling thread; size
+                it to the synthesis slots the caller holds
+            
+        Returns:
+            List aligned with items; a failed item holds its exception instead of a result
+        """
+        results = [None] * len(items)
+        
+        # Cache hits return straight away and Edge/gTTS misses overlap on the network.
+        # Cloned-voice items share the one XTTS model, so they run back to back as one job
+        jobs = [[i] for i, item in enumerate(items) if not item.get('speaker_wav')]
+        cloned = [i for i, item in enumerate(items) if item.get('speaker_wav')]
+        if cloned:
+            jobs.append(cloned)
+        pending = iter(jobs)
+        pending_lock = threading.Lock()
+        
+        def drain():
+            while True:
+                with pending_lock:
+                    indices = next(pending, None)
+                if indices is None:
+                    return
+                for i in indices:
+                    try:
+                        results[i] = self.generate_speech(**items[i], return_bytes=not return_path, return_path=return_path)
+                    except Exception as e:
+                        results[i] = e
+        
+        # The calling thread is one of the workers; the rest come from the shared pool
+        helpers = [_BATCH_POOL.submit(drain) for _ in range(min(len(jobs), max_workers) - 1)]
+        drain()
+        for helper in helpers:
+            helper.result()
+        return results
+
     def generate_speech_stream(self, text, language='en', speed=1.0, voice_id=None):
         """
         Generator function that yields audio chunks for streaming.
         Uses Edge TTS library directly for real-time responsiveness.
         """
-        if not text or len(text.strip()) == 0:
+        if not text or text.isspace():
              return
 
-        # 1. Normalization (using the fixed pronunciation)
-        normalized_text = normalize_text(text, language)
-        if normalized_text != text:
-            logger.info(f"📝 Streaming Text normalized: {text[:20]}... -> {normalized_text[:20]}...")
-            text = normalized_text
-
-        # 2. Caching Check
+        # 1. Caching Check (text seen before skips normalization)
+        cache_key = normalized_text = None
         if self.config.ENABLE_CACHE:
-            cache_path = self._get_cache_path(text, language, voice_id, speed)
-            if os.path.exists(cache_path):
-                logger.info(f"⚡ Cache hit (streaming)! Serving: {text[:20]}...")
-                with open(cache_path, "rb") as f:
-                    while True:
-                        chunk = f.read(8192) # 8KB chunks
-                        if not chunk:
-                            break
-                        yield chunk
+            cache_key, normalized_text = self._resolve_cache_key(text, language, voice_id, speed)
+            hit = self._cache_get(cache_key)
+            if hit is None:
+                cached = self._find_cached(cache_key)
+                if cached:
+                    cache_path, mimetype = cached
+                    with open(cache_path, "rb") as f:
+                        hit = (f.read(), mimetype)
+                    self._cache_put(cache_key, *hit)
+            if hit is not None:
+                logger.debug("⚡ Cache hit (streaming)! Serving: %s...", text[:20])
+                audio_bytes = hit[0]
+                chunk_size = self.config.STREAM_CHUNK_SIZE
+                for start in range(0, len(audio_bytes), chunk_size):
+                    yield audio_bytes[start:start + chunk_size]
                 return
 
+        # 2. Normalization (using the fixed pronunciation)
+        if normalized_text is None:
+            normalized_text = normalize_text(text, language)
+        if normalized_text != text:
+            logger.debug("📝 Streaming Text normalized: %s... -> %s...", text[:20], normalized_text[:20])
+            text = normalized_text
+
         # 3. Stream from Edge TTS
         if voice_id and self.edge_tts_available:
             try:
-                import edge_tts
-                logger.info(f"🎙️  Streaming Edge TTS for {language} (Voice: {voice_id})")
+                logger.debug("🎙️  Streaming Edge TTS for %s (Voice: %s)", language, voice_id)
                 
                 rate_pct = int((speed - 1.0) * 100)
                 rate_str = f"{'+' if rate_pct >= 0 else ''}{rate_pct}%"
                 
-                # collected data in background to cache later
-                audio_buffer = []
-
-                async def _collect_and_yield():
-                    communicate = edge_tts.Communicate(text, voice_id, rate=rate_str)
-                    async for chunk in communicate.stream():
-                        if chunk["type"] == "audio":
-                            audio_buffer.append(chunk["data"])
-                            yield chunk["data"]
-
-                # Run the async generator using a simpler approach
-                def sync_generator():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        gen = _collect_and_yield()
-                        while True:
-                            try:
-                                yield loop.run_until_complete(gen.__anext__())
-                            except StopAsyncIteration:
-                                break
-                    finally:
-                        loop.close()
-
-                for chunk in sync_generator():
-                    yield chunk
-
-                # 4. Save to cache once complete
-                if self.config.ENABLE_CACHE and audio_buffer:
-                    cache_path = self._get_cache_path(text, language, voice_id, speed)
+                # The websocket is driven on the engine's event loop, which hands chunks
+                # over through a queue, so Edge is drained at network speed however slowly
+                # the client reads, and a client that disconnects still leaves a cached result
+                chunks = queue.Queue()
+                
+                async def _pump():
+                    parts = []
                     try:
-                        with open(cache_path, "wb") as f:
-                            for chunk in audio_buffer:
-                                f.write(chunk)
-                        logger.info(f"💾 Stream saved to cache: {cache_path}")
-                    except Exception as ce:
-                        logger.warning(f"Could not save stream to cache: {ce}")
+                        communicate = self._edge_tts.Communicate(text, voice_id, rate=rate_str)
+                        async for chunk in communicate.stream():
+                            if chunk["type"] == "audio":
+                                parts.append(chunk["data"])
+                                chunks.put(chunk["data"])
+                    except Exception as e:
+                        chunks.put(e)
+                        return
+                    chunks.put(_STREAM_END)
+                    # 4. Save to cache once complete, off the event loop
+                    await asyncio.to_thread(self._cache_stream_result, cache_key, parts)
                 
-                return
+                asyncio.run_coroutine_threadsafe(_pump(), self._get_loop())
+                
+                sent_any = False
+                while True:
+                    item = chunks.get()
+                    if item is _STREAM_END:
+                        return
+                    if isinstance(item, Exception):
+                        if sent_any:
+                            # Part of the MP3 already reached the client; a second stream would garble it
+                            logger.error(f"✗ Edge TTS streaming FAILED mid-stream: {item}")
+                            return
+                        raise item
+                    sent_any = True
+                    yield item
             except Exception as e:
                 logger.error(f"✗ Edge TTS streaming FAILED: {e}")
                 # Fallback to non-streaming for gTTS if streaming fails
                 pass
-
+        
         # Fallback: Just use generate_speech and yield in one go if streaming not possible
-        logger.info("Falling back to non-streaming generation for generator...")
+        logger.debug("Falling back to non-streaming generation for generator...")
         try:
             audio_content, _ = self.generate_speech(text, language, speed, voice_id, return_bytes=True)
-            yield audio_content
+            chunk_size = self.config.STREAM_CHUNK_SIZE
+            for start in range(0, len(audio_content), chunk_size):
+                yield audio_content[start:start + chunk_size]
         except Exception as e:
             logger.error(f"All streaming fallbacks failed: {e}")
             raise
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers
+
+Run with threaded gunicorn workers so concurrent synthesis requests overlap:
+    gunicorn -k gthread -w 2 --threads 8 --worker-tmp-dir /dev/shm wsgi:application
+"""
+from app import app
+
+application = app